@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ---------------------------
+# Semantic answer cache for /ask
+# ---------------------------
+# Near-identical questions on the same document ("what is unit 3 about")
+# reuse a previous answer instead of a fresh completion. Entries are keyed by
+# document_id + question embedding and match on cosine similarity. Only
+# questions asked without prior conversation are cached (see /ask), since the
+# answer to a follow-up depends on that chat's memory.
+#
+# Each entry also records the document version it was answered against
+# (IndexCache.document_version); a lookup under a different version misses,
+# so API processes that did not run a reprocessing job stop serving answers
+# built from the replaced chunks.
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class CachedAnswer:
+    def __init__(self, document_id, version, vector, answer, tokens, expires_at):
+        self.document_id = document_id
+        self.version = version
+        self.vector = vector
+        self.answer = answer
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # entry id → CachedAnswer (LRU order)
+        self._by_document = {}          # document_id → set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype="float32").ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_document.get(entry.document_id)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_document[entry.document_id]
+
+    def lookup(self, document_id, version, vector):
+        """Cached answer for a question similar enough to one already answered, else None."""
+        vector = self._normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_document.get(document_id, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now or entry.version != version:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(entry.vector, vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self.tokens_saved += entry.tokens
+            return entry.answer
+
+    def store(self, document_id, version, vector, answer, tokens=None):
+        entry = CachedAnswer(
+            document_id,
+            version,
+            self._normalize(vector),
+            answer,
+            tokens if tokens is not None else estimate_tokens(answer),
+            time.time() + self.ttl,
+        )
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_document.setdefault(document_id, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, document_id):
+        with self._lock:
+            for entry_id in list(self._by_document.get(document_id, ())):
+                self._remove(entry_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+            }
+
+
+answer_cache = AnswerCache()
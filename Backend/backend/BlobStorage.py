@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import tempfile
+
+
+# ---------------------------
+# Content-addressed upload storage
+# ---------------------------
+# Uploads are streamed to a temp file in fixed-size chunks while a SHA-256 is
+# computed, then atomically renamed to blobs/<aa>/<sha256><ext>. Identical
+# files therefore share one blob, and a later upload never overwrites an
+# earlier one. MAX_UPLOAD_BYTES is enforced while streaming.
+#
+# The multipart parser spools the whole request body before the endpoint
+# runs, so UploadSizeLimit also enforces the limit at the ASGI level: an
+# oversized Content-Length is refused up front, and a body that grows past
+# the limit is cut off as the bytes arrive.
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024   # boundaries + part headers around the file
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimit:
+    """ASGI middleware: 413 for request bodies over max_bytes on the given paths."""
+
+    def __init__(self, app, paths, max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"File too large (max {MAX_UPLOAD_BYTES} bytes)"}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge(f"request body exceeds {self.max_bytes} bytes")
+            return message
+
+        async def guarded_send(message):
+            # The app's error response for the aborted body is replaced by the 413
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+
+        if exceeded:
+            await self._reject(send)
+
+
+def blob_path(root, digest, ext):
+    return os.path.join(root, "blobs", digest[:2], f"{digest}{ext}")
+
+
+async def store_upload(upload, root, max_bytes=MAX_UPLOAD_BYTES):
+    """Stream an UploadFile into content-addressed storage.
+
+    Returns (storage_path, sha256 hex digest, size, reused_existing_blob).
+    Raises UploadTooLarge once more than max_bytes have been received.
+    """
+    ext = os.path.splitext(upload.filename or "")[1].lower()
+    tmp_dir = os.path.join(root, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        final_path = blob_path(root, hexdigest, ext)
+
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            return final_path, hexdigest, size, True
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)   # atomic within the same filesystem
+        return final_path, hexdigest, size, False
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
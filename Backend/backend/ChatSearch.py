@@ -0,0 +1,164 @@
+import re
+
+from sqlalchemy import text
+
+
+# ---------------------------
+# Indexed full-text search over chat titles and messages
+# ---------------------------
+# PostgreSQL: tsvector columns (messages.search_vector, chats.search_vector)
+# with GIN indexes, kept current by BEFORE INSERT/UPDATE triggers
+# (migration 0004_chat_search, which backfills existing rows in batches).
+# SQLite: FTS5 external-content tables kept current by triggers, used as a
+# stand-in for local tests.
+#
+# Both return ranked, paginated results with a snippet in one query.
+
+SEARCH_MAX_TERMS = 8
+
+def _postgres_search_ddl(table, column):
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$ "
+        f"BEGIN NEW.search_vector := to_tsvector('english', coalesce(NEW.{column}, '')); "
+        f"RETURN NEW; END $$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}",
+        f"CREATE TRIGGER {table}_search_vector_trg BEFORE INSERT OR UPDATE OF {column} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()",
+        f"UPDATE {table} SET search_vector = to_tsvector('english', coalesce({column}, '')) "
+        f"WHERE search_vector IS NULL",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+    ]
+
+
+# Development schema (AUTO_CREATE_SCHEMA); production uses the migration
+POSTGRES_SEARCH_DDL = _postgres_search_ddl("messages", "content") + _postgres_search_ddl("chats", "title")
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='id')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts USING fts5("
+    "title, content='chats', content_rowid='id')",
+
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+
+    "CREATE TRIGGER IF NOT EXISTS chats_fts_ai AFTER INSERT ON chats BEGIN "
+    "INSERT INTO chats_fts(rowid, title) VALUES (new.id, coalesce(new.title, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS chats_fts_ad AFTER DELETE ON chats BEGIN "
+    "INSERT INTO chats_fts(chats_fts, rowid, title) VALUES ('delete', old.id, coalesce(old.title, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS chats_fts_au AFTER UPDATE ON chats BEGIN "
+    "INSERT INTO chats_fts(chats_fts, rowid, title) VALUES ('delete', old.id, coalesce(old.title, '')); "
+    "INSERT INTO chats_fts(rowid, title) VALUES (new.id, coalesce(new.title, '')); END",
+]
+
+
+def setup_search(engine):
+    """Create the search columns/tables for the engine's dialect (idempotent)."""
+    ddl = POSTGRES_SEARCH_DDL if engine.dialect.name == "postgresql" else SQLITE_SEARCH_DDL
+    with engine.begin() as conn:
+        for statement in ddl:
+            conn.execute(text(statement))
+
+
+def search_terms(q):
+    return re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+
+
+# Best hit per chat (title matches weighted above message matches), one page,
+# with the total match count computed by a window over the same rows.
+POSTGRES_SEARCH_SQL = """
+WITH query AS (
+    SELECT to_tsquery('english', :tsquery) AS q
+),
+hits AS (
+    SELECT m.chat_id, m.id AS message_id, ts_rank(m.search_vector, query.q) AS rank
+    FROM messages m
+    JOIN chats c ON c.id = m.chat_id, query
+    WHERE c.user_id = :user_id AND m.search_vector @@ query.q
+    UNION ALL
+    SELECT c.id, NULL, ts_rank(c.search_vector, query.q) * 2
+    FROM chats c, query
+    WHERE c.user_id = :user_id AND c.search_vector @@ query.q
+),
+best AS (
+    SELECT chat_id, message_id, rank,
+           row_number() OVER (PARTITION BY chat_id ORDER BY rank DESC) AS rn
+    FROM hits
+),
+page AS (
+    SELECT chat_id, message_id, rank, count(*) OVER () AS total
+    FROM best WHERE rn = 1
+    ORDER BY rank DESC, chat_id DESC
+    LIMIT :limit OFFSET :offset
+)
+SELECT page.chat_id, c.title, page.rank, page.total,
+       CASE WHEN page.message_id IS NULL THEN c.title
+            ELSE ts_headline('english', m.content, query.q,
+                             'StartSel=<b>, StopSel=</b>, MaxWords=20, MinWords=8, MaxFragments=1')
+       END AS snippet
+FROM page
+JOIN chats c ON c.id = page.chat_id
+LEFT JOIN messages m ON m.id = page.message_id, query
+ORDER BY page.rank DESC, page.chat_id DESC
+"""
+
+SQLITE_SEARCH_SQL = """
+WITH hits AS (
+    SELECT m.chat_id, -bm25(messages_fts) AS rank,
+           snippet(messages_fts, 0, '<b>', '</b>', '…', 12) AS snippet
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN chats c ON c.id = m.chat_id
+    WHERE messages_fts MATCH :match AND c.user_id = :user_id
+    UNION ALL
+    SELECT c.id, -bm25(chats_fts) * 2, c.title
+    FROM chats_fts
+    JOIN chats c ON c.id = chats_fts.rowid
+    WHERE chats_fts MATCH :match AND c.user_id = :user_id
+),
+best AS (
+    SELECT chat_id, rank, snippet,
+           row_number() OVER (PARTITION BY chat_id ORDER BY rank DESC) AS rn
+    FROM hits
+)
+SELECT best.chat_id, c.title, best.rank, count(*) OVER () AS total, best.snippet
+FROM best
+JOIN chats c ON c.id = best.chat_id
+WHERE best.rn = 1
+ORDER BY best.rank DESC, best.chat_id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+
+def search_chats(db, user_id, q, limit=20, offset=0):
+    """Return (results, total) for a user's chats matching q, best match first."""
+    terms = search_terms(q)
+    if not terms:
+        return [], 0
+
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+
+    # Every term must match; the last one as a prefix (search-as-you-type)
+    if db.get_bind().dialect.name == "postgresql":
+        params["tsquery"] = " & ".join(terms[:-1] + [terms[-1] + ":*"])
+        sql = POSTGRES_SEARCH_SQL
+    else:
+        params["match"] = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        sql = SQLITE_SEARCH_SQL
+
+    rows = db.execute(text(sql), params).fetchall()
+
+    results = [{
+        "chat_id": r.chat_id,
+        "title": r.title,
+        "snippet": r.snippet,
+        "rank": float(r.rank),
+    } for r in rows]
+
+    return results, (rows[0].total if rows else 0)
@@ -0,0 +1,114 @@
+import hashlib
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, select, literal
+
+from DatabaseModels import Documents, DocChunks, EmbeddingCache
+from EmbeddingStorage import EMBEDDING_DTYPE, to_bytes
+
+
+# ---------------------------
+# Content-addressed dedupe for ingestion
+# ---------------------------
+# Chunk level: EmbeddingCache maps sha256(model, normalized chunk text) → vector,
+# so identical chunks in different documents are embedded once.
+# File level: Documents.content_hash lets an identical upload clone the chunk
+# set of an already-processed document with no extraction or embedding.
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def embedding_model_key():
+    from rag_engine.embeddings import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND
+    return f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}"
+
+
+def normalize_chunk(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_hash(text):
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embed_with_cache(db, texts, model):
+    """Embed texts, reusing cached vectors for chunks seen before. Does not commit."""
+    model_key = embedding_model_key()
+    hashes = [chunk_hash(t) for t in texts]
+
+    cached = {
+        row.content_hash: np.frombuffer(row.embedding, dtype=EMBEDDING_DTYPE)
+        for row in db.query(EmbeddingCache.content_hash, EmbeddingCache.embedding)
+                     .filter(EmbeddingCache.model_name == model_key,
+                             EmbeddingCache.content_hash.in_(set(hashes)))
+    }
+
+    # Encode each distinct missing chunk once
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached and h not in missing:
+            missing[h] = t
+
+    if missing:
+        vectors = np.asarray(model.encode(list(missing.values())), dtype=EMBEDDING_DTYPE)
+        new_rows = []
+        for h, vector in zip(missing.keys(), vectors):
+            cached[h] = vector
+            new_rows.append({"content_hash": h, "model_name": model_key,
+                             "embedding": to_bytes(vector), "created_at": datetime.utcnow()})
+        _insert_cache_rows(db, new_rows)
+
+    return np.vstack([cached[h] for h in hashes])
+
+
+def _insert_cache_rows(db, rows):
+    # Another worker may have cached the same chunk concurrently
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        db.execute(pg_insert(EmbeddingCache).on_conflict_do_nothing(), rows)
+    elif db.get_bind().dialect.name == "sqlite":
+        db.execute(insert(EmbeddingCache).prefix_with("OR IGNORE"), rows)
+    else:
+        db.execute(insert(EmbeddingCache), rows)
+
+
+def find_processed_duplicate(db, doc):
+    """Another fully processed document with the same file contents, if any."""
+    if not doc.content_hash:
+        return None
+
+    from DatabaseModels import IngestionJobs
+
+    return db.query(Documents) \
+             .join(IngestionJobs, IngestionJobs.document_id == Documents.id) \
+             .filter(Documents.content_hash == doc.content_hash,
+                     Documents.id != doc.id,
+                     Documents.num_chunks > 0,
+                     IngestionJobs.status == "done") \
+             .order_by(Documents.id.asc()).first()
+
+
+def clone_chunks(db, source_id, target_id):
+    """Copy the chunk set of source_id to target_id in one INSERT ... SELECT. Does not commit."""
+    columns = ["document_id", "chunk_index", "text", "embedding", "embedding_bin", "created_at"]
+    source = select(
+        literal(target_id),
+        DocChunks.chunk_index,
+        DocChunks.text,
+        DocChunks.embedding,
+        DocChunks.embedding_bin,
+        literal(datetime.utcnow()),
+    ).where(DocChunks.document_id == source_id)
+
+    result = db.execute(insert(DocChunks).from_select(columns, source))
+    return result.rowcount
@@ -0,0 +1,76 @@
+import os
+import io
+import csv
+import json
+from datetime import datetime
+
+from DatabaseModels import DocChunks
+
+
+# ---------------------------
+# Bulk DocChunks writes
+# ---------------------------
+# "copy"        → PostgreSQL COPY FROM STDIN (psycopg2), one round trip per batch
+# "executemany" → one INSERT statement executed for the whole batch
+# "orm"         → legacy db.add() per row, kept for comparison/benchmarks
+# "auto"        → copy on PostgreSQL, executemany elsewhere
+
+CHUNK_INSERT_METHOD = os.getenv("CHUNK_INSERT_METHOD", "auto")
+
+COPY_COLUMNS = ("document_id", "chunk_index", "text", "embedding", "embedding_bin", "created_at")
+
+
+def _resolve_method(db, method):
+    method = method or CHUNK_INSERT_METHOD
+    if method == "auto":
+        dialect = db.get_bind().dialect
+        return "copy" if dialect.name == "postgresql" and dialect.driver == "psycopg2" else "executemany"
+    return method
+
+
+def _copy_rows(db, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    now = datetime.utcnow().isoformat()
+
+    for r in rows:
+        embedding = r.get("embedding")
+        embedding_bin = r.get("embedding_bin")
+        writer.writerow([
+            r["document_id"],
+            r["chunk_index"],
+            r["text"],
+            json.dumps(embedding) if embedding is not None else None,
+            "\\x" + embedding_bin.hex() if embedding_bin is not None else None,
+            r.get("created_at") or now,
+        ])
+    buf.seek(0)
+
+    # The session's connection → COPY runs inside the current transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {DocChunks.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_chunk_rows(db, rows, method=None):
+    """Insert DocChunks rows given as dicts of column values. Does not commit."""
+    if not rows:
+        return 0
+
+    method = _resolve_method(db, method)
+
+    if method == "copy":
+        _copy_rows(db, rows)
+    elif method == "executemany":
+        db.execute(DocChunks.__table__.insert(), rows)
+    else:
+        for r in rows:
+            db.add(DocChunks(**r))
+        db.flush()
+
+    return len(rows)
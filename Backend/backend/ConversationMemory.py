@@ -0,0 +1,107 @@
+import os
+import asyncio
+
+from DatabaseConnection import session
+from DatabaseModels import Messages, ChatSummaries
+
+
+# ---------------------------
+# Bounded conversation memory
+# ---------------------------
+# Prompts get the last MEMORY_TAIL messages (fetched with LIMIT, newest first)
+# plus a rolling summary of everything older, stored per chat in
+# ChatSummaries. The summary is folded forward in the background once
+# SUMMARY_TRIGGER older messages have accumulated, so prompt size and DB work
+# per turn stay constant however long the chat gets.
+
+MEMORY_TAIL = int(os.getenv("MEMORY_TAIL", "6"))
+SUMMARY_TRIGGER = int(os.getenv("SUMMARY_TRIGGER", "10"))
+SUMMARY_BATCH_MAX = int(os.getenv("SUMMARY_BATCH_MAX", "40"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "300"))
+
+_pending_tasks = set()
+
+
+def recent_messages(db, chat_id, limit=MEMORY_TAIL):
+    rows = db.query(Messages).filter(Messages.chat_id == chat_id) \
+             .order_by(Messages.created_at.desc(), Messages.id.desc()) \
+             .limit(limit).all()
+    return list(reversed(rows))
+
+
+def memory_text(db, chat_id):
+    """Summary of older turns + the recent tail, formatted for the prompt."""
+    tail = recent_messages(db, chat_id)
+    summary = db.query(ChatSummaries.summary).filter(ChatSummaries.chat_id == chat_id).scalar()
+
+    lines = []
+    if summary:
+        lines.append(f"Summary of earlier conversation: {summary}")
+    lines.extend(f"{m.role}: {m.content}" for m in tail)
+    return "\n".join(lines)
+
+
+async def update_summary(chat_id):
+    from rag_engine.llm import chat_completion_text
+
+    db = session()
+    try:
+        tail = recent_messages(db, chat_id)
+        if len(tail) < MEMORY_TAIL:
+            return
+
+        row = db.query(ChatSummaries).filter(ChatSummaries.chat_id == chat_id).first()
+        upto = row.summarized_upto_id if row else 0
+
+        # Messages that have dropped out of the tail but are not summarized yet
+        older = db.query(Messages).filter(Messages.chat_id == chat_id,
+                                          Messages.id > upto,
+                                          Messages.id < tail[0].id) \
+                  .order_by(Messages.id.asc()).limit(SUMMARY_BATCH_MAX).all()
+
+        if len(older) < SUMMARY_TRIGGER:
+            return
+
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in older)
+        previous = row.summary if row and row.summary else "(none)"
+
+        payload = {
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "temperature": 0.2,
+            "messages": [
+                {"role": "system", "content": (
+                    "You maintain a running summary of a tutoring conversation. "
+                    "Merge the new turns into the existing summary. Keep topics, "
+                    "facts the student was told, and open questions. Plain text, "
+                    "under 200 words."
+                )},
+                {"role": "user", "content": (
+                    f"Existing summary:\n{previous}\n\nNew turns:\n{transcript}"
+                )},
+            ],
+        }
+
+        summary = (await chat_completion_text(payload)).strip()
+
+        if row is None:
+            row = ChatSummaries(chat_id=chat_id)
+            db.add(row)
+        row.summary = summary
+        row.summarized_upto_id = older[-1].id
+        db.commit()
+    except Exception as e:
+        print("❌ Summary update FAILED:", e)
+    finally:
+        db.close()
+
+
+def schedule_summary_update(chat_id):
+    """Fold older turns into the summary in the background (no-op outside the event loop)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    task = loop.create_task(update_summary(chat_id))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime,ForeignKey,JSON
+from sqlalchemy import Column, Integer, String, DateTime,ForeignKey,JSON,LargeBinary,Index,UniqueConstraint,text
 from datetime import datetime
 from sqlalchemy.sql import func
 
@@ -24,6 +24,10 @@ class Chats(Base):
     title = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_chats_user_id_created_at", "user_id", "created_at"),
+    )
+
 
 
 class Messages(Base):
@@ -36,16 +40,21 @@ class Messages(Base):
     content = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_messages_chat_id_created_at", "chat_id", "created_at"),
+    )
+
 
 class Documents(Base):
     __tablename__ = "documents"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     filename = Column(String(255), nullable=False)
     storage_path = Column(String(500), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     num_chunks = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the file
 
 
 
@@ -56,7 +65,24 @@ class DocChunks(Base):
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
     chunk_index = Column(Integer, nullable=False)
     text = Column(String, nullable=False)
-    embedding = Column(JSON, nullable=False)  # store list of floats
+    embedding = Column(JSON(none_as_null=True), nullable=True)  # legacy: list of floats; None → SQL NULL
+    embedding_bin = Column(LargeBinary, nullable=True)  # raw float32 bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # one row per chunk position: a duplicate ingestion run fails instead of
+        # silently doubling the document
+        Index("uq_doc_chunks_document_id_chunk_index", "document_id", "chunk_index", unique=True),
+    )
+
+
+class EmbeddingCache(Base):
+    __tablename__ = "embedding_cache"
+
+    # sha256 of the normalized chunk text; same text + model → same vector
+    content_hash = Column(String(64), primary_key=True)
+    model_name = Column(String(255), primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)  # raw float32 bytes
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -75,6 +101,10 @@ class QuizSessions(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_quiz_sessions_user_id_created_at", "user_id", "created_at"),
+    )
+
 
 class QuizAttempts(Base):
     __tablename__ = "quiz_attempts"
@@ -91,3 +121,65 @@ class QuizAttempts(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
     attempted_at = Column(DateTime(timezone=True), server_default=func.now()) 
+
+    __table_args__ = (
+        Index("ix_quiz_attempts_user_id_quiz_id", "user_id", "quiz_id"),
+        Index("ix_quiz_attempts_quiz_id_attempted_at", "quiz_id", "attempted_at"),
+    )
+
+
+class IngestionJobs(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+
+    # "queued" → "running" → "done" / "failed"
+    status = Column(String(20), nullable=False, default="queued")
+    stage = Column(String(50), nullable=True)  # extracting, chunking, embedding, storing
+    progress = Column(Integer, nullable=False, default=0)  # percent complete
+    chunks_created = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # at most one job processing a document at a time
+        Index("uq_ingestion_jobs_running_document", "document_id", unique=True,
+              postgresql_where=text("status = 'running'"),
+              sqlite_where=text("status = 'running'")),
+    )
+
+
+class ChatSummaries(Base):
+    __tablename__ = "chat_summaries"
+
+    # Rolling summary of the turns older than the prompt's recent-message tail
+    chat_id = Column(Integer, ForeignKey("chats.id"), primary_key=True)
+    summary = Column(String, nullable=False, default="")
+    summarized_upto_id = Column(Integer, nullable=False, default=0)  # last Messages.id folded in
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class QuizPoolQuestions(Base):
+    __tablename__ = "quiz_pool_questions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    question_hash = Column(String(64), nullable=False)  # sha256 of the normalized question text
+    question_json = Column(JSON, nullable=False)  # {"question", "options", "answer"}
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("document_id", "question_hash", name="uq_quiz_pool_document_question"),
+    )
+
+
+class QuizPoolServed(Base):
+    __tablename__ = "quiz_pool_served"
+
+    # Which pooled questions a user has already been given
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("quiz_pool_questions.id"), primary_key=True)
+    served_at = Column(DateTime, default=datetime.utcnow)
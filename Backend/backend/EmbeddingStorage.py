@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+
+# ---------------------------
+# DocChunks embedding storage
+# ---------------------------
+# "binary" stores raw float32 bytes in DocChunks.embedding_bin (384 dims → 1.5 KB
+# per chunk instead of ~8 KB of JSON text). "json" keeps the legacy list-of-floats
+# column. Reads understand both, so rows can be migrated gradually with
+# migrate_embeddings.py.
+
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "binary")
+EMBEDDING_DTYPE = np.float32
+
+
+def embedding_columns(vector):
+    """Column values for one DocChunks row in the configured storage mode."""
+    vector = np.asarray(vector, dtype=EMBEDDING_DTYPE)
+
+    if EMBEDDING_STORAGE == "json":
+        return {"embedding": vector.astype(float).tolist(), "embedding_bin": None}
+
+    return {"embedding": None, "embedding_bin": vector.tobytes()}
+
+
+def to_bytes(vector):
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def load_embedding_matrix(rows):
+    """Build an (n, dim) float32 matrix from rows exposing embedding_bin / embedding."""
+    if not rows:
+        return np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+
+    if all(r.embedding_bin is not None for r in rows):
+        # One contiguous buffer → a single zero-copy view over it
+        buf = b"".join(r.embedding_bin for r in rows)
+        return np.frombuffer(buf, dtype=EMBEDDING_DTYPE).reshape(len(rows), -1)
+
+    return np.vstack([
+        np.frombuffer(r.embedding_bin, dtype=EMBEDDING_DTYPE)
+        if r.embedding_bin is not None
+        else np.asarray(r.embedding, dtype=EMBEDDING_DTYPE)
+        for r in rows
+    ])
@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+
+import faiss
+from sqlalchemy import func
+
+from DatabaseModels import DocChunks, IngestionJobs
+from EmbeddingStorage import load_embedding_matrix
+
+
+# ---------------------------
+# Per-document retrieval index cache
+# ---------------------------
+# Holds the built FAISS index plus the chunk-text array for each document so
+# /ask does not have to reload every DocChunks row and rebuild the index on
+# every question. Bounded by an approximate memory budget with LRU eviction.
+#
+# Entries carry the document's version (id of its latest completed ingestion
+# job), checked on every lookup: invalidate() only reaches the API process
+# that ran the job, so other uvicorn workers notice a reprocessed document
+# through the version, and a build that raced a reprocess is never reused.
+
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class CachedIndex:
+    def __init__(self, index, chunk_texts, nbytes, version):
+        self.index = index
+        self.chunk_texts = chunk_texts
+        self.nbytes = nbytes
+        self.version = version
+
+
+class IndexCache:
+    def __init__(self, max_bytes=INDEX_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # document_id -> CachedIndex
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, document_id, version):
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None and entry.version != version:
+                # Built from chunks an ingestion job has since replaced
+                del self._entries[document_id]
+                self._current_bytes -= entry.nbytes
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(document_id)
+            self.hits += 1
+            return entry
+
+    def put(self, document_id, version, index, chunk_texts, embeddings):
+        nbytes = embeddings.nbytes + sum(len(t) for t in chunk_texts)
+        entry = CachedIndex(index, chunk_texts, nbytes, version)
+
+        with self._lock:
+            old = self._entries.get(document_id)
+            if old is not None and (old.version or 0) > (version or 0):
+                return entry   # a newer build is already cached; serve ours once
+
+            old = self._entries.pop(document_id, None)
+            if old is not None:
+                self._current_bytes -= old.nbytes
+
+            # A single document larger than the whole budget is served but not kept
+            if nbytes > self.max_bytes:
+                return entry
+
+            self._entries[document_id] = entry
+            self._current_bytes += nbytes
+
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+        return entry
+
+    def invalidate(self, document_id):
+        with self._lock:
+            old = self._entries.pop(document_id, None)
+            if old is not None:
+                self._current_bytes -= old.nbytes
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+index_cache = IndexCache()
+
+
+def document_version(db, document_id):
+    """Id of the document's latest completed ingestion job (None if never run as a job)."""
+    return db.query(func.max(IngestionJobs.id)) \
+             .filter(IngestionJobs.document_id == document_id,
+                     IngestionJobs.status == "done").scalar()
+
+
+def build_document_index(document_id, db):
+    """Return the cached index for a document, building it from DocChunks on a miss."""
+    # Read before the chunks: a job finishing mid-build bumps the version, so
+    # the entry stored below is rebuilt on the next lookup
+    version = document_version(db, document_id)
+
+    entry = index_cache.get(document_id, version)
+    if entry is not None:
+        return entry
+
+    chunk_rows = db.query(DocChunks.text, DocChunks.embedding_bin, DocChunks.embedding) \
+                   .filter(DocChunks.document_id == document_id) \
+                   .order_by(DocChunks.chunk_index.asc()).all()
+
+    if not chunk_rows:
+        return None
+
+    chunk_texts = [r.text for r in chunk_rows]
+    chunk_embeddings = load_embedding_matrix(chunk_rows)
+
+    index = faiss.IndexFlatL2(chunk_embeddings.shape[1])
+    index.add(chunk_embeddings)
+
+    return index_cache.put(document_id, version, index, chunk_texts, chunk_embeddings)
@@ -0,0 +1,284 @@
+import os
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from DatabaseConnection import session, engine
+from DatabaseModels import Documents, DocChunks, IngestionJobs
+from EmbeddingStorage import embedding_columns
+from ChunkWriter import insert_chunk_rows
+from ChunkDedupe import file_sha256, find_processed_duplicate, clone_chunks, embed_with_cache
+
+
+# ---------------------------
+# Background ingestion jobs (extract → chunk → embed → store)
+# ---------------------------
+# /process_document only records an IngestionJobs row and hands the job id to a
+# process pool; the CPU-heavy extraction/OCR/embedding runs in the workers and
+# reports stage + percent back through the same row. Jobs left queued/running
+# when the server stopped are picked up again by resume_pending_jobs().
+#
+# Every uvicorn worker may submit the same job id (resume, sweeps); a worker
+# only runs it after claiming it with a conditional queued → running UPDATE,
+# and a partial unique index allows one running job per document.
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+INGEST_MP_CONTEXT = os.getenv("INGEST_MP_CONTEXT", "spawn")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# A running job whose row has not been touched for this long is considered
+# orphaned (its server died) and is queued again
+INGEST_STALE_SECONDS = int(os.getenv("INGEST_STALE_SECONDS", "600"))
+
+_executor = None
+_on_done_callbacks = []
+_submitted = {}   # job id -> future, for jobs waiting/running in this process's pool
+
+
+def _worker_init():
+    # Never reuse pooled connections inherited from the parent process
+    engine.dispose()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context(INGEST_MP_CONTEXT),
+            initializer=_worker_init,
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def on_job_done(callback):
+    """Register callback(document_id) run in the API process when a job finishes."""
+    _on_done_callbacks.append(callback)
+
+
+def _update(db, job, **fields):
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.commit()
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+def process_document(db, job):
+    from rag_engine.rag import extract_pages, count_pages, iter_chunks, iter_batches
+    from rag_engine.embeddings import get_embedding_model
+
+    doc = db.query(Documents).filter(Documents.id == job.document_id).first()
+    if not doc:
+        raise ValueError("Document not found")
+
+    # A job interrupted mid-way keeps the batches it already committed
+    resume_from = job.chunks_created or 0
+    db.query(DocChunks).filter(DocChunks.document_id == doc.id,
+                               DocChunks.chunk_index >= resume_from).delete()
+    db.commit()
+
+    # Identical file already processed (e.g. a whole class uploading the same
+    # syllabus) → clone its chunk set, no extraction or embedding needed
+    if resume_from == 0 and not doc.storage_path.startswith("http"):
+        if not doc.content_hash:   # set at upload time for new documents
+            doc.content_hash = file_sha256(doc.storage_path)
+            db.commit()
+
+        duplicate = find_processed_duplicate(db, doc)
+        if duplicate is not None:
+            _update(db, job, stage="cloning", progress=50)
+            cloned = clone_chunks(db, duplicate.id, doc.id)
+            doc.num_chunks = cloned
+            db.commit()
+            return cloned
+
+    total_pages = max(count_pages(doc.storage_path), 1)
+    pages_done = 0
+
+    def counted_pages():
+        nonlocal pages_done
+        for page in extract_pages(doc.storage_path):
+            pages_done += 1
+            # Heartbeat during long extraction/OCR before the next batch commit
+            if datetime.utcnow() - (job.updated_at or datetime.min) > timedelta(seconds=INGEST_STALE_SECONDS / 4):
+                job.updated_at = datetime.utcnow()
+                db.commit()
+            yield page
+
+    _update(db, job, stage="extracting", progress=1)
+
+    # extract → chunk → embed → store, one fixed-size batch at a time
+    chunk_index = 0
+    for batch in iter_batches(iter_chunks(counted_pages(), chunk_size=200), INGEST_BATCH_SIZE):
+        if chunk_index + len(batch) <= resume_from:
+            chunk_index += len(batch)
+            continue
+
+        skip = max(resume_from - chunk_index, 0)
+        batch = batch[skip:]
+        chunk_index += skip
+
+        # Chunks already embedded for any document come from the cache
+        embeddings = embed_with_cache(db, batch, get_embedding_model())
+
+        insert_chunk_rows(db, [
+            {
+                "document_id": doc.id,
+                "chunk_index": chunk_index + i,
+                "text": chunk,
+                **embedding_columns(embeddings[i])  # float32 bytes (or JSON array)
+            }
+            for i, chunk in enumerate(batch)
+        ])
+        chunk_index += len(batch)
+
+        doc.num_chunks = chunk_index
+        job.chunks_created = chunk_index
+        job.stage = "embedding"
+        job.progress = min(99, pages_done * 100 // total_pages)
+        db.commit()  # per-batch commit: progress is durable, ORM rows can be freed
+
+    if chunk_index == 0:
+        raise ValueError("No text extracted")
+
+    doc.num_chunks = chunk_index
+    db.commit()
+
+    return chunk_index
+
+
+def claim_job(db, job_id):
+    """Atomically move a queued job to running; False if it is not ours to run."""
+    try:
+        claimed = db.query(IngestionJobs) \
+                    .filter(IngestionJobs.id == job_id, IngestionJobs.status == "queued") \
+                    .update({"status": "running", "stage": "starting", "progress": 0, "error": None},
+                            synchronize_session=False)
+        db.commit()
+        return claimed == 1
+    except IntegrityError:
+        # Another job is already processing this document
+        db.rollback()
+        db.query(IngestionJobs) \
+          .filter(IngestionJobs.id == job_id, IngestionJobs.status == "queued") \
+          .update({"status": "failed", "error": "Document is already being processed by another job"},
+                  synchronize_session=False)
+        db.commit()
+        return False
+
+
+def run_job(job_id):
+    db = session()
+    try:
+        if not claim_job(db, job_id):
+            return None
+
+        job = db.query(IngestionJobs).filter(IngestionJobs.id == job_id).first()
+
+        try:
+            chunks_created = process_document(db, job)
+        except Exception as e:
+            db.rollback()
+            _update(db, job, status="failed", error=str(e))
+            return None   # on-done callbacks only fire for completed jobs
+
+        _update(db, job, status="done", stage="done", progress=100, chunks_created=chunks_created)
+        return job.document_id
+    finally:
+        db.close()
+
+
+# ---------------------------
+# API side
+# ---------------------------
+def _job_finished(future, job_id):
+    _submitted.pop(job_id, None)
+    try:
+        document_id = future.result()
+    except Exception as e:
+        print("❌ Ingestion worker crashed:", e)
+        return
+
+    if document_id is not None:
+        for callback in _on_done_callbacks:
+            callback(document_id)
+
+
+def submit_job(job_id):
+    if job_id in _submitted:
+        return _submitted[job_id]
+
+    future = get_executor().submit(run_job, job_id)
+    _submitted[job_id] = future
+    future.add_done_callback(lambda f: _job_finished(f, job_id))
+    return future
+
+
+def enqueue_job(db, document_id):
+    # A document already queued/being processed is not processed twice
+    active = db.query(IngestionJobs) \
+               .filter(IngestionJobs.document_id == document_id,
+                       IngestionJobs.status.in_(["queued", "running"])) \
+               .order_by(IngestionJobs.id.desc()).first()
+    if active is not None:
+        return active, submit_job(active.id)
+
+    job = IngestionJobs(document_id=document_id, status="queued", stage="queued", progress=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    future = submit_job(job.id)
+    return job, future
+
+
+def resume_pending_jobs():
+    """Requeue orphaned running jobs and submit every queued one.
+
+    Safe to call from every API process and repeatedly: a job is only
+    requeued once its heartbeat (updated_at) is stale, and claim_job()
+    lets exactly one worker run it.
+    """
+    db = session()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=INGEST_STALE_SECONDS)
+        db.query(IngestionJobs) \
+          .filter(IngestionJobs.status == "running", IngestionJobs.updated_at < cutoff) \
+          .update({"status": "queued"}, synchronize_session=False)
+        db.commit()
+
+        pending = db.query(IngestionJobs.id) \
+                    .filter(IngestionJobs.status == "queued") \
+                    .order_by(IngestionJobs.id.asc()).all()
+
+        pending = [job for job in pending if job.id not in _submitted]
+        for job in pending:
+            submit_job(job.id)
+
+        return len(pending)
+    finally:
+        db.close()
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "document_id": job.document_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "chunks_created": job.chunks_created,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
@@ -0,0 +1,46 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+# ---------------------------
+# Keyset (cursor) pagination helpers
+# ---------------------------
+# Cursors are opaque url-safe strings wrapping the sort key of the last row
+# on a page: (timestamp, id). Pages are fetched with `(ts, id) < cursor`
+# instead of OFFSET, so deep pages cost the same as the first one.
+
+def encode_cursor(ts, row_id):
+    raw = json.dumps([ts.isoformat() if ts else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Return (datetime, id) or None for an empty/invalid cursor."""
+    if not cursor:
+        return None
+    try:
+        ts, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(ts) if ts else None), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def before_cursor(ts_column, id_column, cursor):
+    """Filter for rows that sort after `cursor` in (ts desc, id desc) order."""
+    ts, row_id = cursor
+    if ts is None:
+        return id_column < row_id
+    return or_(ts_column < ts, and_(ts_column == ts, id_column < row_id))
+
+
+def page_of(rows, limit, ts_attr, id_attr="id"):
+    """Split a limit+1 fetch into (page, next_cursor)."""
+    limit = max(limit, 1)
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(getattr(last, ts_attr), getattr(last, id_attr))
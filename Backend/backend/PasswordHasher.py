@@ -0,0 +1,141 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+# ---------------------------
+# Password hashing off the event loop
+# ---------------------------
+# bcrypt is deliberately slow (tens to hundreds of ms of CPU per call) and
+# releases the GIL while it runs, so hashing/verification happens in a small
+# dedicated thread pool instead of blocking every in-flight request. A login
+# spike queues up behind BCRYPT_WORKERS threads; beyond BCRYPT_MAX_QUEUE
+# waiting calls new requests are turned away (HasherBusy) instead of piling up.
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "256"))
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=BCRYPT_WORKERS, max_queue=BCRYPT_MAX_QUEUE):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+
+        self.queued = 0      # submitted, waiting for a thread
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    # -- blocking primitives (run inside the pool) --
+
+    def _tracked(self, fn, *args):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def _verify(self, password, hashed):
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:   # malformed stored hash
+            return False
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HasherBusy()
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def started(*args):
+            # Leaves the queue once a thread picks it up
+            with self._lock:
+                self.queued -= 1
+            return self._tracked(*args)
+
+        def dequeued(future):
+            # A call cancelled before it ever ran must still give its slot back
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        future = self._executor.submit(started, fn, *args)
+        future.add_done_callback(dequeued)
+        return await asyncio.wrap_future(future)
+
+    # -- public API --
+
+    async def hash(self, password):
+        return await self._submit(self._hash, password)
+
+    async def verify(self, password, hashed):
+        return await self._submit(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        # "$2b$12$<salt+hash>" → cost factor is the second field
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    async def verify_and_update(self, password, hashed):
+        """Verify a password; returns (ok, new_hash) where new_hash is set when the
+        stored hash uses a different cost factor and should be replaced."""
+        if not await self.verify(password, hashed):
+            return False, None
+
+        if self.needs_rehash(hashed):
+            # Best effort: the password is already verified, so a busy pool or
+            # failed rehash must not fail the login; the next login retries it
+            try:
+                new_hash = await self.hash(password)
+            except Exception as e:
+                print(f"❌ Password rehash skipped: {e!r}")
+                return True, None
+            with self._lock:
+                self.rehashed += 1
+            return True, new_hash
+
+        return True, None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from DatabaseModels import DocChunks
+from EmbeddingStorage import load_embedding_matrix
+
+
+# ---------------------------
+# Coverage-aware context for /generate_quiz
+# ---------------------------
+# Instead of the first few chunks, cluster the document's stored embeddings
+# with k-means and take the chunk nearest each centroid (largest clusters
+# first) until the token budget is spent, so one LLM call covers the whole
+# document. The default budget matches the old chunks[:5] (~5 × 200 words).
+
+QUIZ_CONTEXT_TOKEN_BUDGET = int(os.getenv("QUIZ_CONTEXT_TOKEN_BUDGET", "1300"))
+KMEANS_ITERATIONS = 25
+
+_encoding = None
+_NO_ENCODING = object()   # tiktoken unavailable (not installed / offline): don't retry
+
+
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = _NO_ENCODING
+
+    if _encoding is _NO_ENCODING:
+        return int(len(text.split()) * 1.3) + 1
+    return len(_encoding.encode(text))
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Plain k-means with k-means++ seeding; returns (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+
+    centroids = [vectors[rng.integers(n)]]
+    for _ in range(1, k):
+        dist = np.min([((vectors - c) ** 2).sum(axis=1) for c in centroids], axis=0)
+        total = dist.sum()
+        probs = dist / total if total > 0 else np.full(n, 1 / n)
+        centroids.append(vectors[rng.choice(n, p=probs)])
+    centroids = np.array(centroids)
+
+    labels = np.zeros(n, dtype=int)
+    for it in range(iterations):
+        dist = ((vectors[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if it and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for j in range(k):
+            members = vectors[labels == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+
+    return centroids, labels
+
+
+def select_quiz_context(db, document_id, token_budget=QUIZ_CONTEXT_TOKEN_BUDGET, seed=0):
+    """Representative chunk texts (in document order) fitting within token_budget."""
+    rows = db.query(DocChunks.chunk_index, DocChunks.text, DocChunks.embedding_bin, DocChunks.embedding) \
+             .filter(DocChunks.document_id == document_id) \
+             .order_by(DocChunks.chunk_index.asc()).all()
+
+    if not rows:
+        return []
+
+    tokens = [count_tokens(r.text) for r in rows]
+
+    # Whole document fits → nothing to choose
+    if sum(tokens) <= token_budget:
+        return [r.text for r in rows]
+
+    vectors = load_embedding_matrix(rows).astype("float32")
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    avg_tokens = max(sum(tokens) / len(tokens), 1)
+    k = int(min(len(rows), max(1, token_budget // avg_tokens)))
+    centroids, labels = kmeans(vectors, k, seed=seed)
+
+    # Largest topics first; within a topic, the chunk closest to its centroid
+    order = np.argsort(-np.bincount(labels, minlength=k))
+    selected, used = [], 0
+    for j in order:
+        members = np.where(labels == j)[0]
+        if not len(members):
+            continue
+        best = members[((vectors[members] - centroids[j]) ** 2).sum(axis=1).argmin()]
+        if used + tokens[best] > token_budget:
+            continue
+        selected.append(best)
+        used += tokens[best]
+
+    if not selected:   # a single chunk larger than the budget
+        selected = [int(np.argmin(tokens))]
+
+    return [rows[i].text for i in sorted(selected)]
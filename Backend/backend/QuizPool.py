@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from DatabaseConnection import session
+from DatabaseModels import QuizPoolQuestions, QuizPoolServed
+from QuizContext import select_quiz_context
+
+
+# ---------------------------
+# Pre-generated quiz question pool per document
+# ---------------------------
+# After a document is processed its pool is stocked with validated questions
+# in the background. /generate_quiz then samples questions the user has not
+# seen yet straight from the database, and tops the pool up asynchronously
+# whenever a user's unseen count drops below QUIZ_POOL_LOW_WATERMARK.
+
+QUIZ_POOL_BATCH = int(os.getenv("QUIZ_POOL_BATCH", "10"))            # questions per LLM call
+QUIZ_POOL_TARGET = int(os.getenv("QUIZ_POOL_TARGET", "40"))          # initial stock
+QUIZ_POOL_MAX = int(os.getenv("QUIZ_POOL_MAX", "200"))               # hard cap per document
+QUIZ_POOL_LOW_WATERMARK = int(os.getenv("QUIZ_POOL_LOW_WATERMARK", "10"))
+QUIZ_MAX_QUESTIONS = int(os.getenv("QUIZ_MAX_QUESTIONS", "20"))      # per /generate_quiz call
+TAKE_ATTEMPTS = 3
+
+_refilling = set()       # document ids with a refill in flight
+_pending_tasks = set()
+
+
+# ---------------------------
+# Prompt / parsing / validation (shared with on-demand generation)
+# ---------------------------
+def build_quiz_payload(num_questions, context):
+    prompt = (
+        f"Generate {num_questions} multiple-choice quiz questions "
+        f"ONLY in JSON using this EXACT format:\n"
+        "{\n"
+        '  "questions": [\n'
+        "     {\n"
+        '       "question": "string",\n'
+        '       "options": ["A","B","C","D"],\n'
+        '       "answer": "A"\n'
+        "     }\n"
+        "  ]\n"
+        "}\n\n"
+        "DO NOT output anything except pure JSON.\n\n"
+        f"PDF Content:\n{context}"
+    )
+
+    return {
+        "messages": [
+            {"role": "system", "content": "Respond ONLY with JSON. No markdown, no explanations."},
+            {"role": "user", "content": prompt},
+        ]
+    }
+
+
+def parse_quiz_output(raw_output):
+    """Extract the quiz JSON object from model output; raises ValueError."""
+    clean = raw_output.replace("```json", "").replace("```", "").strip()
+
+    match = re.search(r"\{[\s\S]*\}", clean)
+    if not match:
+        raise ValueError("no JSON object in model output")
+
+    return json.loads(match.group(0))
+
+
+def is_valid_question(q):
+    if not isinstance(q, dict):
+        return False
+
+    question, options, answer = q.get("question"), q.get("options"), q.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        return False
+    if not isinstance(options, list) or len(options) < 2 or \
+            not all(isinstance(o, str) and o.strip() for o in options):
+        return False
+    if not isinstance(answer, str):
+        return False
+
+    letters = [chr(ord("A") + i) for i in range(len(options))]
+    return answer in options or answer in letters
+
+
+def question_hash(q):
+    normalized = " ".join(q["question"].lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+# Pool storage
+# ---------------------------
+def add_questions(db, document_id, questions):
+    """Store valid, not-yet-pooled questions up to QUIZ_POOL_MAX; returns the stored rows. Commits."""
+    existing = {h for (h,) in db.query(QuizPoolQuestions.question_hash)
+                                .filter(QuizPoolQuestions.document_id == document_id)}
+    room = QUIZ_POOL_MAX - len(existing)
+
+    rows = []
+    for q in questions:
+        if len(rows) >= room:
+            break
+        if not is_valid_question(q):
+            continue
+        h = question_hash(q)
+        if h in existing:
+            continue
+        existing.add(h)
+        rows.append(QuizPoolQuestions(
+            document_id=document_id,
+            question_hash=h,
+            question_json={"question": q["question"], "options": q["options"], "answer": q["answer"]},
+        ))
+
+    db.add_all(rows)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent refill stored one of these questions first
+        db.rollback()
+        return []
+    return rows
+
+
+def mark_served(db, user_id, rows):
+    db.add_all(QuizPoolServed(user_id=user_id, question_id=r.id) for r in rows)
+    db.commit()
+
+
+def _unseen_query(db, user_id, document_id):
+    seen = db.query(QuizPoolServed.question_id).filter(QuizPoolServed.user_id == user_id)
+    return db.query(QuizPoolQuestions).filter(QuizPoolQuestions.document_id == document_id,
+                                              QuizPoolQuestions.id.notin_(seen))
+
+
+def take_unseen(db, user_id, document_id, num_questions):
+    """Randomly sample up to num_questions unseen questions and mark them served.
+
+    Two concurrent requests from the same user can sample the same rows; the
+    loser's insert hits the served primary key and it samples again.
+    """
+    for _ in range(TAKE_ATTEMPTS):
+        rows = _unseen_query(db, user_id, document_id).order_by(func.random()).limit(num_questions).all()
+        if len(rows) < num_questions:
+            return rows
+        try:
+            mark_served(db, user_id, rows)
+            return rows
+        except IntegrityError:
+            db.rollback()
+    return []
+
+
+def unseen_count(db, user_id, document_id):
+    return _unseen_query(db, user_id, document_id).count()
+
+
+def clear_pool(document_id):
+    """Drop a document's pooled questions once its chunks have been rewritten."""
+    db = session()
+    try:
+        ids = db.query(QuizPoolQuestions.id).filter(QuizPoolQuestions.document_id == document_id)
+        db.query(QuizPoolServed).filter(QuizPoolServed.question_id.in_(ids)) \
+          .delete(synchronize_session=False)
+        db.query(QuizPoolQuestions).filter(QuizPoolQuestions.document_id == document_id) \
+          .delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def pool_size(db, document_id):
+    return db.query(QuizPoolQuestions).filter(QuizPoolQuestions.document_id == document_id).count()
+
+
+# ---------------------------
+# Background generation
+# ---------------------------
+async def generate_batch(db, document_id, num_questions, seed=0):
+    from rag_engine.llm import chat_completion_text
+
+    # Clustering the document's embeddings is CPU work; keep it off the event loop
+    chunks = await asyncio.to_thread(select_quiz_context, db, document_id, seed=seed)
+    if not chunks:
+        return []
+
+    payload = build_quiz_payload(num_questions, "\n\n".join(chunks))
+    payload["temperature"] = 0.9   # variety across refill batches
+
+    raw_output = await chat_completion_text(payload, timeout=60)
+    return parse_quiz_output(raw_output).get("questions", [])
+
+
+async def refill_pool(document_id, target=QUIZ_POOL_TARGET):
+    if document_id in _refilling:
+        return
+    _refilling.add(document_id)
+
+    db = session()
+    try:
+        size = pool_size(db, document_id)
+        goal = min(size + target, QUIZ_POOL_MAX)
+        seed = size   # a different cluster seeding per refill → different chunks
+        failures = 0
+
+        while size < goal and failures < 3:
+            try:
+                questions = await generate_batch(db, document_id, QUIZ_POOL_BATCH, seed=seed)
+                added = add_questions(db, document_id, questions)
+            except Exception as e:
+                print("❌ Quiz pool batch FAILED:", e)
+                db.rollback()
+                added = []
+
+            failures = failures + 1 if not added else 0
+            size += len(added)
+            seed += 1
+
+        print(f"Quiz pool for document {document_id}: {size} questions")
+    finally:
+        db.close()
+        _refilling.discard(document_id)
+
+
+def schedule_refill(document_id, loop=None):
+    """Start a background refill; safe to call from worker threads when loop is given."""
+    if loop is not None:
+        asyncio.run_coroutine_threadsafe(refill_pool(document_id), loop)
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    task = loop.create_task(refill_pool(document_id))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
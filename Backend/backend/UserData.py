@@ -0,0 +1,131 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func
+
+from DatabaseModels import Chats, Messages, Documents
+from Pagination import decode_cursor, before_cursor, page_of, encode_cursor
+
+
+# ---------------------------
+# /user_full_data queries
+# ---------------------------
+# A constant number of queries regardless of how many chats a user has:
+# user, documents, the chats (or one page of them), and the messages of every chat
+# in a single windowed query.
+
+def user_dict(user):
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "created_at": user.created_at
+    }
+
+
+def document_dicts(db, user_id):
+    docs = db.query(Documents).filter(Documents.user_id == user_id).all()
+    return [{
+        "document_id": d.id,
+        "filename": d.filename,
+        "uploaded_at": d.uploaded_at,
+        "num_chunks": d.num_chunks,
+        "storage_path": d.storage_path
+    } for d in docs]
+
+
+def fetch_chat_page(db, user_id, limit=None, cursor=None):
+    query = db.query(Chats).filter(Chats.user_id == user_id)
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(before_cursor(Chats.created_at, Chats.id, position))
+
+    query = query.order_by(Chats.created_at.desc(), Chats.id.desc())
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    return page_of(rows, limit, "created_at")
+
+
+def query_chat_messages(db, chats, message_limit=None):
+    """Newest `message_limit` messages (+1 to detect more) of each chat, one query.
+
+    Rows come back grouped by chat in page order, oldest message first.
+    """
+    chat_ids = [c.id for c in chats]
+
+    rn = func.row_number().over(
+        partition_by=Messages.chat_id,
+        order_by=(Messages.created_at.desc(), Messages.id.desc()),
+    ).label("rn")
+
+    sub = db.query(Messages.id, Messages.chat_id, Messages.role, Messages.content,
+                   Messages.created_at, rn) \
+            .filter(Messages.chat_id.in_(chat_ids)).subquery()
+
+    query = db.query(sub).join(Chats, Chats.id == sub.c.chat_id)
+    if message_limit is not None:
+        query = query.filter(sub.c.rn <= message_limit + 1)
+
+    return query.order_by(Chats.created_at.desc(), Chats.id.desc(),
+                          sub.c.created_at.asc(), sub.c.id.asc())
+
+
+def _message_dict(m):
+    return {
+        "message_id": m.id,
+        "role": m.role,
+        "content": m.content,
+        "created_at": m.created_at
+    }
+
+
+def _chat_dict(c):
+    return {
+        "chat_id": c.id,
+        "title": c.title,
+        "document_id": c.document_id,
+        "created_at": c.created_at,
+    }
+
+
+def iter_chats_with_messages(db, chats, message_limit=None, yield_per=500):
+    """Yield (chat_dict, [message_dict, ...]) per chat while streaming the message
+    rows, so only one chat's messages are held at a time."""
+    rows = iter(query_chat_messages(db, chats, message_limit).yield_per(yield_per))
+    pending = next(rows, None)
+
+    for c in chats:
+        msgs = []
+        has_more = False
+
+        while pending is not None and pending.chat_id == c.id:
+            if message_limit is not None and pending.rn > message_limit:
+                has_more = True   # the extra (oldest) row only flags older messages
+            else:
+                msgs.append(pending)
+            pending = next(rows, None)
+
+        chat = _chat_dict(c)
+        chat["has_more_messages"] = has_more
+        chat["next_message_cursor"] = encode_cursor(msgs[0].created_at, msgs[0].id) if has_more else None
+        yield chat, [_message_dict(m) for m in msgs]
+
+
+def iter_user_full_data_json(db, user, chats, next_chat_cursor, message_limit=None):
+    """Same document as the non-streamed response, emitted piece by piece."""
+    def dump(value):
+        return json.dumps(jsonable_encoder(value))
+
+    yield '{"status": true, "user": ' + dump(user_dict(user))
+    yield ', "documents": ' + dump(document_dicts(db, user.id))
+    yield ', "next_chat_cursor": ' + dump(next_chat_cursor)
+    yield ', "chats": ['
+
+    for i, (chat, messages) in enumerate(iter_chats_with_messages(db, chats, message_limit)):
+        chat["messages"] = messages
+        yield ("," if i else "") + dump(chat)
+
+    yield "]}"
@@ -0,0 +1,100 @@
+"""Benchmark DocChunks insert throughput (rows/sec) for each ChunkWriter method.
+
+Usage (from Backend/backend):
+    python bench_chunk_insert.py [--rows 10000] [--batch-size 64] [--db-url postgresql://...]
+
+Without --db-url the benchmark runs against a throwaway SQLite file that is
+deleted afterwards. A --db-url database must already be migrated (alembic
+upgrade head); the schema is never created there, and the rows written by
+the benchmark are removed again afterwards. Point it at a scratch database,
+not production.
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import DatabaseModels
+from DatabaseModels import Users, Documents, DocChunks
+from EmbeddingStorage import embedding_columns
+from ChunkWriter import insert_chunk_rows
+
+
+def make_rows(document_id, num_rows, dim=384):
+    words = ("lorem ipsum dolor sit amet consectetur adipiscing elit " * 25).split()
+    text = " ".join(words[:200])
+    vectors = np.random.rand(num_rows, dim).astype("float32")
+    return [
+        {"document_id": document_id, "chunk_index": i, "text": text, **embedding_columns(vectors[i])}
+        for i in range(num_rows)
+    ]
+
+
+def run(db, method, rows, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        insert_chunk_rows(db, rows[i:i + batch_size], method=method)
+        db.commit()  # per-batch commit, same as the ingestion pipeline
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--db-url", default=None)
+    args = parser.parse_args()
+
+    scratch_dir = None
+    if args.db_url:
+        engine = create_engine(args.db_url)
+    else:
+        scratch_dir = tempfile.mkdtemp(prefix="bench-chunks-")
+        engine = create_engine(f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}")
+        DatabaseModels.Base.metadata.create_all(bind=engine)
+
+    try:
+        bench(engine, args)
+    finally:
+        engine.dispose()
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def bench(engine, args):
+    db = sessionmaker(bind=engine)()
+
+    user = Users(email=f"bench-{time.time()}@example.com", password_hash="-")
+    db.add(user)
+    db.commit()
+    doc = Documents(user_id=user.id, filename="bench.pdf", storage_path="bench.pdf")
+    db.add(doc)
+    db.commit()
+
+    methods = ["orm", "executemany"]
+    if engine.dialect.name == "postgresql":
+        methods.append("copy")
+
+    rows = make_rows(doc.id, args.rows)
+    print(f"{args.rows} chunk rows, batch size {args.batch_size}, {engine.dialect.name}")
+
+    try:
+        for method in methods:
+            elapsed = run(db, method, rows, args.batch_size)
+            print(f"{method:>12}: {elapsed:7.2f}s  {args.rows / elapsed:10.0f} rows/sec")
+            db.query(DocChunks).filter(DocChunks.document_id == doc.id).delete()
+            db.commit()
+    finally:
+        db.delete(doc)
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark query embedding under concurrent load: one encode per request vs EmbeddingBatcher.
+
+Usage (from Backend/backend):
+    python bench_query_batching.py [--askers 50] [--rounds 20]
+
+Each asker embeds --rounds questions back to back; throughput and
+p50/p99 latency are reported for both modes.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag_engine.embeddings import get_embedding_model
+from rag_engine.batcher import EmbeddingBatcher
+
+QUESTION = "What are the main topics covered in unit {} of the syllabus?"
+
+
+async def run_askers(embed, askers, rounds):
+    latencies = []
+
+    async def asker(n):
+        for r in range(rounds):
+            start = time.perf_counter()
+            await embed(QUESTION.format(n * rounds + r))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(asker(n) for n in range(askers)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+async def main(askers, rounds):
+    model = get_embedding_model()
+    model.encode(["warm up"])
+
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def unbatched(text):
+        return await asyncio.get_running_loop().run_in_executor(executor, model.encode, [text])
+
+    batcher = EmbeddingBatcher()
+
+    for name, embed in (("unbatched", unbatched), ("batched", batcher.encode)):
+        qps, p50, p99 = await run_askers(embed, askers, rounds)
+        print(f"{name:>10}: {qps:8.1f} queries/sec   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+
+    print("batcher:", batcher.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--askers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.askers, args.rounds))
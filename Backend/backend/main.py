@@ -2,43 +2,61 @@ from fastapi import FastAPI, Depends, Request, UploadFile, File, HTTPException
 
 import os
 import sys
+import asyncio
+import contextlib
 from DatabaseModels import Users
 from DatabaseModels import Chats
 from DatabaseModels import Messages
 from DatabaseModels import Documents
-from DatabaseModels import DocChunks
 from DatabaseModels import QuizSessions
 from DatabaseModels import QuizAttempts
+from DatabaseModels import IngestionJobs
+from DatabaseModels import ChatSummaries
 
 import json
-import re
-import faiss
 from DatabaseConnection import session, engine
 import DatabaseModels
-import requests
 from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
 from fastapi.middleware.cors import CORSMiddleware
-import bcrypt
-from sentence_transformers import SentenceTransformer
+from fastapi.responses import StreamingResponse
 import pdfplumber
-import numpy as np
+from IndexCache import index_cache, build_document_index, document_version
+from PasswordHasher import password_hasher, HasherBusy
+from AnswerCache import answer_cache
+from BlobStorage import store_upload, UploadTooLarge, UploadSizeLimit, MAX_UPLOAD_BYTES
+from Pagination import decode_cursor, before_cursor, page_of
+from ChatSearch import setup_search, search_chats as search_chat_index
+from QuizContext import select_quiz_context
+from QuizPool import (
+    build_quiz_payload, parse_quiz_output, add_questions, mark_served,
+    take_unseen, unseen_count, schedule_refill, clear_pool,
+    QUIZ_POOL_LOW_WATERMARK, QUIZ_MAX_QUESTIONS
+)
+from ConversationMemory import memory_text, schedule_summary_update
+from UserData import user_dict, document_dicts, fetch_chat_page, iter_chats_with_messages, iter_user_full_data_json
+from IngestionJobs import enqueue_job, resume_pending_jobs, on_job_done, shutdown_executor, job_to_dict, INGEST_STALE_SECONDS
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from rag_engine.rag import (
-    extract_text,
-    chunk_text,
     build_faiss_index,
     ask_question
 )
+from rag_engine.embeddings import warm_up, embedding_model_info
+from rag_engine.batcher import query_embedder
+from rag_engine.llm import chat_completion, chat_completion_text, stream_chat_completion, close_client
+from rag_engine.web_fetch import fetch_urls
+import httpx
 
 
 
 
 app = FastAPI()
 
-
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+# Oversized uploads are refused while the body arrives, before it is spooled
+# (added first so the CORS middleware still wraps the 413)
+app.add_middleware(UploadSizeLimit, paths=["/upload_document"])
 
 # CORS Middleware
 app.add_middleware(
@@ -49,7 +67,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DatabaseModels.Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic (cd Backend && alembic upgrade head);
+# AUTO_CREATE_SCHEMA=1 keeps the old create_all() for throwaway dev databases
+if os.getenv("AUTO_CREATE_SCHEMA", "0") == "1":
+    DatabaseModels.Base.metadata.create_all(bind=engine)
+    setup_search(engine)
+
+
+# Chunks rewritten by an ingestion job → drop the cached retrieval index
+# and any answers generated from the old chunks
+on_job_done(index_cache.invalidate)
+on_job_done(answer_cache.invalidate)
+
+# ... and restock the document's quiz pool from the new chunks. Job callbacks
+# run on a worker thread, so the refill is handed to the event loop captured
+# at startup.
+event_loop = None
+
+
+@app.on_event("startup")
+async def captureEventLoop():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+
+
+def stockQuizPool(document_id):
+    if event_loop is not None:
+        schedule_refill(document_id, loop=event_loop)
+
+
+on_job_done(clear_pool)
+on_job_done(stockQuizPool)
+
+
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+
+@app.on_event("startup")
+async def warmUpEmbeddingModel():
+    # Load in the background so the server binds its port immediately
+    if EMBEDDING_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+
+@app.on_event("startup")
+async def resumeIngestionJobs():
+    # Periodic sweep: also picks up jobs orphaned by a crashed worker process
+    async def sweep():
+        while True:
+            try:
+                resumed = await asyncio.to_thread(resume_pending_jobs)
+                if resumed:
+                    print(f"Resumed {resumed} pending ingestion jobs")
+            except Exception as e:
+                print("❌ Ingestion job sweep failed:", e)
+            await asyncio.sleep(INGEST_STALE_SECONDS)
+
+    asyncio.create_task(sweep())
+
+
+@app.on_event("shutdown")
+async def shutdownLLMClient():
+    await close_client()
+    shutdown_executor()
+    password_hasher.shutdown()
 
 def get_db():
     db = session()
@@ -64,13 +145,19 @@ UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ---------------------------
-# Password Helpers
+# Password Helpers (bcrypt runs in PasswordHasher's thread pool)
 # ---------------------------
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise HTTPException(503, "Server busy, please retry")
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(plain: str, hashed: str):
+    try:
+        return await password_hasher.verify_and_update(plain, hashed)
+    except HasherBusy:
+        raise HTTPException(503, "Server busy, please retry")
 
 
 @app.get("/")
@@ -95,7 +182,7 @@ async def addNewUser(request: Request, db: Session = Depends(get_db)):
         return {"message": "User already exists"}
 
     # Hash password before saving
-    hashed_pw = hash_password(password)
+    hashed_pw = await hash_password(password)
 
     new_user = Users(
         email=email,
@@ -127,9 +214,15 @@ async def loginUser(request: Request, db: Session = Depends(get_db)):
         return {"message": "User not found", "status": False}
 
     # Verify password
-    if not verify_password(password, user.password_hash):
+    ok, new_hash = await verify_password(password, user.password_hash)
+    if not ok:
         return {"message": "Incorrect password", "status": False}
 
+    # Cost factor changed since this hash was made → upgrade it transparently
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+
     return {
         "message": "Login successful",
         "status": True,
@@ -231,9 +324,23 @@ async def sendMessage(request: Request, db: Session = Depends(get_db)):
 
 #get messages based on chatid
 @app.get("/get_messages/{chat_id}")
-def getMessages(chat_id: int, db: Session = Depends(get_db)):
+def getMessages(chat_id: int, before: str = None, limit: int = None, db: Session = Depends(get_db)):
+
+    query = db.query(Messages).filter(Messages.chat_id == chat_id)
+
+    # Older pages: ?before=<next_message_cursor>&limit=N (newest N before the cursor)
+    position = decode_cursor(before)
+    if position is not None:
+        query = query.filter(before_cursor(Messages.created_at, Messages.id, position))
 
-    msgs = db.query(Messages).filter(Messages.chat_id == chat_id).order_by(Messages.created_at.asc()).all()
+    next_cursor = None
+    if limit is not None:
+        limit = min(max(limit, 1), 500)
+        rows = query.order_by(Messages.created_at.desc(), Messages.id.desc()).limit(limit + 1).all()
+        rows, next_cursor = page_of(rows, limit, "created_at")
+        msgs = list(reversed(rows))
+    else:
+        msgs = query.order_by(Messages.created_at.asc()).all()
 
     result = []
 
@@ -245,7 +352,7 @@ def getMessages(chat_id: int, db: Session = Depends(get_db)):
             "created_at": m.created_at
         })
 
-    return {"messages": result}
+    return {"messages": result, "next_cursor": next_cursor}
 
 
 #Documents table
@@ -262,17 +369,18 @@ async def uploadDocument(
     if not user:
         return {"message": "User not found", "status": False}
 
-    # Save file to disk
-    file_location = os.path.join(UPLOAD_DIR, f"user_{user_id}_{file.filename}")
-    
-    with open(file_location, "wb") as f:
-        f.write(await file.read())
+    # Stream file to disk (hashed, size-limited, content-addressed)
+    try:
+        file_location, content_hash, size, reused = await store_upload(file, UPLOAD_DIR)
+    except UploadTooLarge:
+        raise HTTPException(413, f"File too large (max {MAX_UPLOAD_BYTES} bytes)")
 
     # Insert metadata into DB
     new_doc = Documents(
         user_id=user_id,
         filename=file.filename,
         storage_path=file_location,
+        content_hash=content_hash,
         num_chunks=0
     )
 
@@ -284,6 +392,8 @@ async def uploadDocument(
         "message": "Document uploaded",
         "document_id": new_doc.id,
         "storage_path": file_location,
+        "size": size,
+        "reused_existing": reused,
         "status": True
     }
 
@@ -311,44 +421,103 @@ def getDocuments(user_id: int, db: Session = Depends(get_db)):
 # Process uploaded document (extract → chunk → embed → store)
 # ---------------------------
 @app.post("/process_document/{document_id}")
-def processDocument(document_id: int, db: Session = Depends(get_db)):
+async def processDocument(document_id: int, wait: bool = False, db: Session = Depends(get_db)):
 
     doc = db.query(Documents).filter(Documents.id == document_id).first()
     if not doc:
         return {"message": "Document not found", "status": False}
 
-    file_path = doc.storage_path
+    # Extraction / embedding run in the ingestion worker pool
+    job, future = enqueue_job(db, document_id)
+
+    if wait:
+        await asyncio.wrap_future(future)
+        db.refresh(job)
+
+        # Another process claimed the job first: report where it stands
+        # instead of a failure with no message
+        if job.status not in ("done", "failed"):
+            return {"status": True, "job": job_to_dict(job)}
 
-    # Extract text
-    text = extract_text(file_path)
+        return {
+            "message": "Document processed Successfully" if job.status == "done" else job.error,
+            "job_id": job.id,
+            "chunks_created": job.chunks_created or 0,
+            "status": job.status == "done"
+        }
 
-    if not text.strip():
-        return {"message": "No text extracted", "status": False}
+    return {
+        "message": "Document queued for processing",
+        "job_id": job.id,
+        "status": True
+    }
 
-    # Create chunks
-    chunks = chunk_text(text, chunk_size=200)
 
-    # Embed chunks
-    embeddings = embedding_model.encode(chunks)
-    embeddings = embeddings.astype(float)  # convert numpy.float32 → float
+@app.get("/job_status/{job_id}")
+def jobStatus(job_id: int, db: Session = Depends(get_db)):
 
-    # Store chunks + embeddings
-    for i, chunk in enumerate(chunks):
-        new_c = DocChunks(
-            document_id=document_id,
-            chunk_index=i,
-            text=chunk,
-            embedding=embeddings[i].tolist()  # JSON array
-        )
-        db.add(new_c)
+    job = db.query(IngestionJobs).filter(IngestionJobs.id == job_id).first()
+    if not job:
+        return {"message": "Job not found", "status": False}
 
-    doc.num_chunks = len(chunks)
-    db.commit()
+    return {"status": True, "job": job_to_dict(job)}
+
+
+MAX_URLS_PER_REQUEST = int(os.getenv("MAX_URLS_PER_REQUEST", "50"))
+
+
+@app.post("/ingest_urls")
+async def ingestUrls(request: Request, db: Session = Depends(get_db)):
+    data = await request.json()
+    user_id = data.get("user_id")
+    urls = data.get("urls")
+
+    user = db.query(Users).filter(Users.id == user_id).first()
+    if not user:
+        return {"message": "User not found", "status": False}
+
+    if not isinstance(urls, list) or any(not isinstance(u, str) for u in urls):
+        return {"message": "urls must be a list of strings", "status": False}
+    urls = list(dict.fromkeys(u.strip() for u in urls if u.strip()))
+
+    if not urls:
+        return {"message": "No URLs given", "status": False}
+    if len(urls) > MAX_URLS_PER_REQUEST:
+        return {"message": f"Too many URLs (max {MAX_URLS_PER_REQUEST})", "status": False}
+    if any(not u.startswith(("http://", "https://")) for u in urls):
+        return {"message": "Only http(s) URLs are supported", "status": False}
+    if any(len(u) > 500 for u in urls):   # Documents.storage_path is String(500)
+        return {"message": "URLs longer than 500 characters are not supported", "status": False}
+
+    # Fetch the whole batch concurrently; this fills the on-disk HTTP cache,
+    # so the ingestion jobs below read the pages without refetching them
+    fetched = await fetch_urls(urls)
+
+    results = []
+    for url in urls:
+        result = fetched[url]
+        if not result.ok:
+            results.append({"url": url, "status": False, "message": result.error})
+            continue
+
+        doc = Documents(user_id=user_id, filename=url[:255], storage_path=url, num_chunks=0)
+        db.add(doc)
+        db.commit()
+        db.refresh(doc)
+
+        job, _ = enqueue_job(db, doc.id)
+        results.append({
+            "url": url,
+            "status": True,
+            "document_id": doc.id,
+            "job_id": job.id,
+            "from_cache": result.from_cache
+        })
 
     return {
-        "message": "Document processed Successfully",
-        "chunks_created": len(chunks),
-        "status": True
+        "message": "URLs queued for processing",
+        "documents": results,
+        "status": any(r["status"] for r in results)
     }
 
 
@@ -356,19 +525,12 @@ def processDocument(document_id: int, db: Session = Depends(get_db)):
 # ---------------------------
 # GENERAL AI CHAT (No PDF Mode)
 # ---------------------------
-def general_ai_chat(question, chat_id, user_id, db):
-
-    # Load last messages for memory
-    past_msgs = db.query(Messages).filter(Messages.chat_id == chat_id) \
-                   .order_by(Messages.created_at.asc()).all()
-
-    memory_text = "\n".join([f"{m.role}: {m.content}" for m in past_msgs[-6:]])
+def build_general_payload(question, chat_id, db):
 
-    groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
-    api_key = ""
+    # Recent messages + rolling summary of older turns
+    memory = memory_text(db, chat_id)
 
-    payload = {
-        "model": "llama-3.3-70b-versatile",
+    return {
         "messages": [
             {
                 "role": "system",
@@ -387,86 +549,56 @@ def general_ai_chat(question, chat_id, user_id, db):
             {
                 "role": "user",
                 "content":
-                f"{memory_text}\n\nUser question (reply in HTML): {question}"
+                f"{memory}\n\nUser question (reply in HTML): {question}"
             }
         ]
     }
 
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    response = requests.post(groq_api_url, json=payload, headers=headers)
-    result = response.json()
-
-    answer = result["choices"][0]["message"]["content"]
 
-    # Save messages
+def save_exchange(db, chat_id, user_id, question, answer):
     db.add(Messages(chat_id=chat_id, user_id=user_id, role="user", content=question))
     db.add(Messages(chat_id=chat_id, user_id=None, role="assistant", content=answer))
     db.commit()
 
-    return {"status": True, "answer": answer}
+    schedule_summary_update(chat_id)
 
 
+async def general_ai_chat(question, chat_id, user_id, db):
 
-# ---------------------------
-# /ask ENDPOINT — Unified RAG + General Chat (HTML replies)
-# ---------------------------
-@app.post("/ask")
-async def askQuestion(request: Request, db: Session = Depends(get_db)):
+    payload = build_general_payload(question, chat_id, db)
 
-    data = await request.json()
+    answer = await chat_completion_text(payload)
 
-    chat_id = data.get("chat_id")
-    user_id = data.get("user_id")
-    question = data.get("question")
-
-    if not chat_id or not user_id or not question:
-        return {"message": "chat_id, user_id, and question are required", "status": False}
+    # Save messages
+    save_exchange(db, chat_id, user_id, question, answer)
 
-    # Validate chat
-    chat = db.query(Chats).filter(Chats.id == chat_id).first()
-    if not chat:
-        return {"message": "Chat not found", "status": False}
+    return {"status": True, "answer": answer}
 
-    document_id = chat.document_id
 
-    # No document → General chat mode
-    if document_id is None:
-        return general_ai_chat(question, chat_id, user_id, db)
 
-    # Load PDF chunks
-    chunk_rows = db.query(DocChunks).filter(DocChunks.document_id == document_id).all()
+# ---------------------------
+# RAG prompt for document chats
+# ---------------------------
+async def build_rag_payload(question, chat_id, document_id, db, q_vec):
 
-    if not chunk_rows:
-        return general_ai_chat(question, chat_id, user_id, db)
+    # Load (or reuse cached) FAISS index for the document
+    cached = build_document_index(document_id, db)
 
-    chunk_texts = [c.text for c in chunk_rows]
-    chunk_embeddings = np.array([c.embedding for c in chunk_rows], dtype="float32")
+    if cached is None:
+        return None
 
-    # Build FAISS Index
-    dimension = len(chunk_embeddings[0])
-    index = faiss.IndexFlatL2(dimension)
-    index.add(chunk_embeddings)
+    chunk_texts = cached.chunk_texts
 
-    # Embed question
-    q_embed = embedding_model.encode([question])
-    q_embed = np.array(q_embed, dtype="float32")
+    q_embed = q_vec.reshape(1, -1)
 
-    distances, idxs = index.search(q_embed, k=3)
+    distances, idxs = cached.index.search(q_embed, k=min(3, len(chunk_texts)))
     relevant_context = "\n".join([chunk_texts[i] for i in idxs[0]])
 
-    # Last few messages for memory
-    past_msgs = db.query(Messages).filter(Messages.chat_id == chat_id) \
-                       .order_by(Messages.created_at.asc()).all()
-
-    memory_text = "\n".join([f"{m.role}: {m.content}" for m in past_msgs[-6:]])
+    # Recent messages + rolling summary of older turns
+    memory = memory_text(db, chat_id)
 
     # --- GROQ CALL FOR DETAILED RESPONSE ---
-    groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
-    api_key = ""
-
-    payload = {
-        "model": "llama-3.3-70b-versatile",
+    return {
         "max_tokens": 3000,  # ⬅ LONG ANSWERS
         "temperature": 0.7,
         "top_p": 1.0,
@@ -489,7 +621,7 @@ async def askQuestion(request: Request, db: Session = Depends(get_db)):
             {
                 "role": "user",
                 "content": (
-                    f"<strong>Conversation Memory:</strong>\n{memory_text}\n\n"
+                    f"<strong>Conversation Memory:</strong>\n{memory}\n\n"
                     f"<strong>Relevant Extracted PDF Context:</strong>\n{relevant_context}\n\n"
                     f"<strong>User Question:</strong> {question}\n\n"
                     "Provide a deeply detailed HTML explanation."
@@ -498,82 +630,235 @@ async def askQuestion(request: Request, db: Session = Depends(get_db)):
         ]
     }
 
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
 
-    response = requests.post(groq_api_url, json=payload, headers=headers)
-    result = response.json()
+async def build_ask_payload(question, chat, db):
+    # Returns (payload, cache_key, cached_answer); cache_key is only set when the
+    # answer may be shared through the answer cache (RAG mode, first question)
+    if chat.document_id is not None:
+        # Embed question (coalesced with concurrent askers into one batch)
+        q_vec = await query_embedder.encode(question)
+
+        # Answers depend on the chat's conversation memory once it has turns
+        # ("explain that more simply"), so only a chat's opening question is
+        # looked up in / stored to the per-document cache shared by all users
+        has_history = db.query(Messages.id).filter(Messages.chat_id == chat.id).first() is not None
+        cache_key = None
+        if not has_history:
+            # Version read before the chunks, as in build_document_index()
+            cache_key = (chat.document_id, document_version(db, chat.document_id), q_vec)
+
+        # Near-identical question already answered on this document → no LLM call
+        if cache_key is not None:
+            cached_answer = answer_cache.lookup(*cache_key)
+            if cached_answer is not None:
+                return None, cache_key, cached_answer
+
+        payload = await build_rag_payload(question, chat.id, chat.document_id, db, q_vec)
+        if payload is not None:
+            return payload, cache_key, None
+
+    # No document (or not processed yet) → General chat mode
+    return build_general_payload(question, chat.id, db), None, None
+
+
+
+# ---------------------------
+# /ask ENDPOINT — Unified RAG + General Chat (HTML replies)
+# ---------------------------
+@app.post("/ask")
+async def askQuestion(request: Request, db: Session = Depends(get_db)):
+
+    data = await request.json()
+
+    chat_id = data.get("chat_id")
+    user_id = data.get("user_id")
+    question = data.get("question")
+
+    if not chat_id or not user_id or not question:
+        return {"message": "chat_id, user_id, and question are required", "status": False}
+
+    # Validate chat
+    chat = db.query(Chats).filter(Chats.id == chat_id).first()
+    if not chat:
+        return {"message": "Chat not found", "status": False}
+
+    payload, cache_key, cached_answer = await build_ask_payload(question, chat, db)
 
+    if cached_answer is not None:
+        save_exchange(db, chat_id, user_id, question, cached_answer)
+        return {"status": True, "answer": cached_answer, "cached": True}
+
+    result = await chat_completion(payload)
     answer = result["choices"][0]["message"]["content"]
 
+    if cache_key is not None:
+        tokens = (result.get("usage") or {}).get("total_tokens")
+        answer_cache.store(*cache_key, answer, tokens=tokens)
+
     # Store messages
-    db.add(Messages(chat_id=chat_id, user_id=user_id, role="user", content=question))
-    db.add(Messages(chat_id=chat_id, user_id=None, role="assistant", content=answer))
-    db.commit()
+    save_exchange(db, chat_id, user_id, question, answer)
 
     return {"status": True, "answer": answer}
 
 
 
+# ---------------------------
+# /ask_stream ENDPOINT — same as /ask, tokens sent as Server-Sent Events
+# ---------------------------
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def save_exchange_new_session(chat_id, user_id, question, answer):
+    # The request-scoped session may already be closed once streaming starts
+    db = session()
+    try:
+        save_exchange(db, chat_id, user_id, question, answer)
+    finally:
+        db.close()
+
+
+async def stream_cached_answer(chat_id, user_id, question, answer):
+    save_exchange_new_session(chat_id, user_id, question, answer)
+    yield sse_event({"token": answer})
+    yield sse_event({"status": True, "answer": answer, "cached": True}, event="done")
+
+
+async def stream_answer(request, payload, chat_id, user_id, question, cache_key=None):
+    parts = []
+
+    try:
+        # aclosing() finalizes the upstream generator as soon as this loop is
+        # left (client gone / task cancelled), closing the Groq connection
+        # right away instead of whenever the generator is garbage-collected.
+        async with contextlib.aclosing(stream_chat_completion(payload)) as tokens:
+            async for token in tokens:
+                if await request.is_disconnected():
+                    return
+                parts.append(token)
+                yield sse_event({"token": token})
+    except httpx.HTTPError as e:
+        print("❌ Groq stream FAILED:", e)
+        yield sse_event({"status": False, "message": "LLM request failed"}, event="error")
+        return
+
+    answer = "".join(parts)
+
+    if cache_key is not None:
+        answer_cache.store(*cache_key, answer)
+
+    save_exchange_new_session(chat_id, user_id, question, answer)
+
+    yield sse_event({"status": True, "answer": answer}, event="done")
+
+
+@app.post("/ask_stream")
+async def askQuestionStream(request: Request, db: Session = Depends(get_db)):
+
+    data = await request.json()
+
+    chat_id = data.get("chat_id")
+    user_id = data.get("user_id")
+    question = data.get("question")
+
+    if not chat_id or not user_id or not question:
+        return {"message": "chat_id, user_id, and question are required", "status": False}
+
+    chat = db.query(Chats).filter(Chats.id == chat_id).first()
+    if not chat:
+        return {"message": "Chat not found", "status": False}
+
+    payload, cache_key, cached_answer = await build_ask_payload(question, chat, db)
+
+    if cached_answer is not None:
+        stream = stream_cached_answer(chat_id, user_id, question, cached_answer)
+    else:
+        stream = stream_answer(request, payload, chat_id, user_id, question, cache_key)
+
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+# Embedding model load state
+@app.get("/embedding_model_info")
+def embeddingModelInfo():
+    return {"status": True, "model": embedding_model_info(), "query_batching": query_embedder.stats()}
+
+
+# Retrieval index cache counters
+@app.get("/index_cache_stats")
+def indexCacheStats():
+    return {"status": True, "stats": index_cache.stats()}
+
+
+# Semantic answer cache hit rate / tokens saved
+@app.get("/answer_cache_stats")
+def answerCacheStats():
+    return {"status": True, "stats": answer_cache.stats()}
+
+
+# bcrypt pool queue depth / rehash counts
+@app.get("/password_hasher_stats")
+def passwordHasherStats():
+    return {"status": True, "stats": password_hasher.stats()}
+
+
+
 #Retrieveing full user data
 @app.get("/user_full_data/{user_id}")
-def getUserFullData(user_id: int, db: Session = Depends(get_db)):
+def getUserFullData(
+    user_id: int,
+    chat_limit: int = None,
+    chat_cursor: str = None,
+    message_limit: int = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
 
     #fetch User
     user = db.query(Users).filter(Users.id == user_id).first()
     if not user:
         return {"status": False, "message": "User not found"}
 
-    user_data = {
-        "user_id": user.id,
-        "email": user.email,
-        "full_name": user.full_name,
-        "created_at": user.created_at
-    }
-
-    #fetch documents
-    docs = db.query(Documents).filter(Documents.user_id == user_id).all()
-
-    document_list = []
-    for d in docs:
-        document_list.append({
-            "document_id": d.id,
-            "filename": d.filename,
-            "uploaded_at": d.uploaded_at,
-            "num_chunks": d.num_chunks,
-            "storage_path": d.storage_path
-        })
-    #fetch chats
-    chats = db.query(Chats).filter(Chats.user_id == user_id).all()
-
+    #paging is opt-in: without limits the full history is returned
+    if chat_limit is not None:
+        chat_limit = min(max(chat_limit, 1), 200)
+    if message_limit is not None:
+        message_limit = min(max(message_limit, 1), 500)
+
+    #fetch chats (newest first); with chat_limit, older pages via next_chat_cursor
+    chats, next_chat_cursor = fetch_chat_page(db, user_id, chat_limit, chat_cursor)
+
+    if stream:
+        def generate():
+            # The request-scoped session may already be closed once streaming starts
+            stream_db = session()
+            try:
+                # chats are already loaded; only their ids/columns are read here
+                yield from iter_user_full_data_json(stream_db, user, chats,
+                                                    next_chat_cursor, message_limit)
+            finally:
+                stream_db.close()
+
+        return StreamingResponse(generate(), media_type="application/json")
+
+    #fetch the newest messages of every chat on the page in one query
     chat_list = []
-
-    for c in chats:
-        # Fetch Messages for each chat
-        msgs = db.query(Messages).filter(Messages.chat_id == c.id) \
-                .order_by(Messages.created_at.asc()).all()
-
-        message_list = []
-        for m in msgs:
-            message_list.append({
-                "message_id": m.id,
-                "role": m.role,
-                "content": m.content,
-                "created_at": m.created_at
-            })
-
-        chat_list.append({
-            "chat_id": c.id,
-            "title": c.title,
-            "document_id": c.document_id,
-            "created_at": c.created_at,
-            "messages": message_list
-        })
+    for chat, messages in iter_chats_with_messages(db, chats, message_limit):
+        chat["messages"] = messages
+        chat_list.append(chat)
 
     #build Final Response JSON
     return {
         "status": True,
-        "user": user_data,
-        "documents": document_list,
+        "user": user_dict(user),
+        "documents": document_dicts(db, user_id),
+        "next_chat_cursor": next_chat_cursor,
         "chats": chat_list
     }
 
@@ -592,6 +877,7 @@ async def removeChatDocument(request: Request, db: Session = Depends(get_db)):
 
     # 1️⃣ Delete all messages inside this chat
     db.query(Messages).filter(Messages.chat_id == chat_id).delete()
+    db.query(ChatSummaries).filter(ChatSummaries.chat_id == chat_id).delete()
 
     # 2️⃣ Delete the chat itself
     db.delete(chat)
@@ -607,28 +893,21 @@ async def removeChatDocument(request: Request, db: Session = Depends(get_db)):
 #search history
 
 @app.get("/search_chats/{user_id}")
-def search_chats(user_id: int, q: str, db: Session = Depends(get_db)):
-    q = q.lower()
-
-    chats = db.query(Chats).filter(Chats.user_id == user_id).all()
-    messages = db.query(Messages).join(Chats, Messages.chat_id == Chats.id)\
-                                 .filter(Chats.user_id == user_id).all()
+def search_chats(user_id: int, q: str, page: int = 1, page_size: int = 20, db: Session = Depends(get_db)):
 
-    results = {}
-
-    # 🔍 Search in chat titles
-    for chat in chats:
-        if q in chat.title.lower():
-            results[chat.id] = {"chat_id": chat.id, "title": chat.title}
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
 
-    # 🔍 Search in ALL messages (user + assistant)
-    for msg in messages:
-        if msg.content and q in msg.content.lower():
-            chat = db.query(Chats).filter(Chats.id == msg.chat_id).first()
-            if chat:
-                results[chat.id] = {"chat_id": chat.id, "title": chat.title}
+    # 🔍 Ranked full-text search over chat titles + ALL messages, one query
+    results, total = search_chat_index(db, user_id, q, limit=page_size, offset=(page - 1) * page_size)
 
-    return {"status": True, "results": list(results.values())}
+    return {
+        "status": True,
+        "results": results,
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    }
 
 
 # quiz generation endpoints
@@ -646,90 +925,28 @@ async def generate_quiz(request: Request, db: Session = Depends(get_db)):
     if not user_id or not document_id:
         raise HTTPException(400, "user_id and document_id are required")
 
-    # Load processed chunks
-    chunks = db.query(DocChunks).filter(DocChunks.document_id == document_id).all()
-
-    print(f"STEP 2: Loaded {len(chunks)} chunks")
-
-    if not chunks:
-        raise HTTPException(400, "Document not processed")
-
-    # LIMIT CONTEXT to avoid LLM overload
-    context = "\n\n".join(c.text for c in chunks[:5])
-    print("STEP 3: Prepared context")
-
-    # LLM REQUEST 
-    groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
-    api_key = ""  
-
-    prompt = (
-        f"Generate {num_questions} multiple-choice quiz questions "
-        f"ONLY in JSON using this EXACT format:\n"
-        "{\n"
-        '  "questions": [\n'
-        "     {\n"
-        '       "question": "string",\n'
-        '       "options": ["A","B","C","D"],\n'
-        '       "answer": "A"\n'
-        "     }\n"
-        "  ]\n"
-        "}\n\n"
-        "DO NOT output anything except pure JSON.\n\n"
-        f"PDF Content:\n{context}"
-    )
-
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [
-            {"role": "system", "content": "Respond ONLY with JSON. No markdown, no explanations."},
-            {"role": "user", "content": prompt},
-        ]
-    }
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    print("STEP 4: Calling Groq API...")
-
     try:
-        response = requests.post(
-            groq_api_url,
-            json=payload,
-            headers=headers,
-            timeout=40
-        )
-    except Exception as e:
-        print("❌ Groq API FAILED:", e)
-        raise HTTPException(500, "Groq API timeout or error")
+        num_questions = min(max(int(num_questions), 1), QUIZ_MAX_QUESTIONS)
+    except (TypeError, ValueError):
+        raise HTTPException(400, "num_questions must be an integer")
 
-    print("STEP 5: Groq responded")
-
-    # Extract Groq message
-    result = response.json()
-    raw_output = result["choices"][0]["message"]["content"]
-
-    print("STEP 6: Raw output received")
-    print(raw_output)
+    # Serve from the pre-generated pool when it has enough unseen questions
+    pooled = take_unseen(db, user_id, document_id, num_questions)
 
-    
-    #  CLEAN JSON FROM MODEL OUTPUT
-    clean = raw_output.replace("```json", "").replace("```", "").strip()
+    if len(pooled) == num_questions:
+        print("STEP 2: Served from quiz pool")
+        quiz_data = {"questions": [r.question_json for r in pooled]}
 
-    match = re.search(r"\{[\s\S]*\}", clean)
-    if not match:
-        print("❌ JSON Extract FAILED:", clean)
-        raise HTTPException(500, "Groq returned INVALID JSON")
+        if unseen_count(db, user_id, document_id) < QUIZ_POOL_LOW_WATERMARK:
+            schedule_refill(document_id)
 
-    json_str = match.group(0)
+    else:
+        # Pool empty / exhausted for this user → generate now, keep for the pool
+        quiz_data = await generate_quiz_now(db, document_id, num_questions)
 
-    try:
-        quiz_data = json.loads(json_str)
-    except Exception as e:
-        print("❌ JSON PARSE FAILED:", e)
-        print("BAD JSON:", json_str)
-        raise HTTPException(500, "Groq returned INVALID JSON")
+        stored = add_questions(db, document_id, quiz_data.get("questions", []))
+        mark_served(db, user_id, stored)
+        schedule_refill(document_id)
 
     print("STEP 7: JSON is valid, saving to DB...")
 
@@ -753,6 +970,43 @@ async def generate_quiz(request: Request, db: Session = Depends(get_db)):
         "quiz": quiz_data
     }
 
+
+async def generate_quiz_now(db, document_id, num_questions):
+
+    # Representative chunks across the whole document, within the token budget
+    chunks = await asyncio.to_thread(select_quiz_context, db, document_id)
+
+    print(f"STEP 2: Selected {len(chunks)} chunks")
+
+    if not chunks:
+        raise HTTPException(400, "Document not processed")
+
+    context = "\n\n".join(chunks)
+    print("STEP 3: Prepared context")
+
+    # LLM REQUEST 
+    payload = build_quiz_payload(num_questions, context)
+
+    print("STEP 4: Calling Groq API...")
+
+    try:
+        raw_output = await chat_completion_text(payload, timeout=40)
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        print("❌ Groq API FAILED:", e)
+        raise HTTPException(500, "Groq API timeout or error")
+
+    print("STEP 5: Groq responded")
+
+    print("STEP 6: Raw output received")
+    print(raw_output)
+
+    #  CLEAN JSON FROM MODEL OUTPUT
+    try:
+        return parse_quiz_output(raw_output)
+    except ValueError as e:
+        print("❌ JSON PARSE FAILED:", e)
+        raise HTTPException(500, "Groq returned INVALID JSON")
+
 # Validate Quiz Answers
 @app.post("/validate_quiz")
 async def validate_quiz(request: Request, db: Session = Depends(get_db)):
@@ -819,28 +1073,80 @@ async def validate_quiz(request: Request, db: Session = Depends(get_db)):
     }
 # Quiz History Endpoint
 @app.get("/quiz_history/{user_id}")
-def quiz_history(user_id: int, db: Session = Depends(get_db)):
-    
-    sessions = db.query(QuizSessions).filter(QuizSessions.user_id == user_id).all()
-    attempts = db.query(QuizAttempts).filter(QuizAttempts.user_id == user_id).all()
+def quiz_history(
+    user_id: int,
+    limit: int = 50,
+    cursor: str = None,
+    stats: bool = False,
+    db: Session = Depends(get_db)
+):
+
+    limit = min(max(limit, 1), 200)
+
+    # Latest attempt per quiz, ranked in the database
+    attempt_rank = func.row_number().over(
+        partition_by=QuizAttempts.quiz_id,
+        order_by=(QuizAttempts.attempted_at.desc(), QuizAttempts.id.desc()),
+    ).label("rn")
+
+    latest = db.query(
+        QuizAttempts.quiz_id,
+        QuizAttempts.score,
+        QuizAttempts.total_questions,
+        QuizAttempts.attempted_at,
+        attempt_rank,
+    ).filter(QuizAttempts.user_id == user_id).subquery()
+
+    query = db.query(
+        QuizSessions.id,
+        QuizSessions.document_id,
+        QuizSessions.num_questions,
+        QuizSessions.created_at,
+        latest.c.score,
+        latest.c.total_questions,
+        latest.c.attempted_at,
+    ).outerjoin(latest, and_(latest.c.quiz_id == QuizSessions.id, latest.c.rn == 1)) \
+     .filter(QuizSessions.user_id == user_id)
+
+    # Keyset pagination, newest quizzes first
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(before_cursor(QuizSessions.created_at, QuizSessions.id, position))
+
+    rows = query.order_by(QuizSessions.created_at.desc(), QuizSessions.id.desc()).limit(limit + 1).all()
+    rows, next_cursor = page_of(rows, limit, "created_at")
 
     output = []
 
-    for s in sessions:
-        quiz_attempts = [a for a in attempts if a.quiz_id == s.id]
+    for r in rows:
+        output.append({
+            "quiz_id": r.id,
+            "document_id": r.document_id,
+            "num_questions": r.num_questions,
+            "created_at": r.created_at,
+            "last_score": r.score,
+            "total_questions": r.total_questions,
+            "attempted_at": r.attempted_at
+        })
+
+    response = {"status": True, "history": output, "next_cursor": next_cursor}
 
-        latest_attempt = None
-        if quiz_attempts:
-            latest_attempt = max(quiz_attempts, key=lambda x: x.attempted_at)
+    # Optional per-document aggregates over all of the user's attempts
+    if stats:
+        doc_stats = db.query(
+            QuizSessions.document_id,
+            func.count(QuizAttempts.id).label("attempts"),
+            func.max(QuizAttempts.score).label("best_score"),
+            func.avg(QuizAttempts.score).label("average_score"),
+        ).join(QuizAttempts, QuizAttempts.quiz_id == QuizSessions.id) \
+         .filter(QuizAttempts.user_id == user_id) \
+         .group_by(QuizSessions.document_id).all()
 
-        output.append({
-            "quiz_id": s.id,
+        response["document_stats"] = [{
             "document_id": s.document_id,
-            "num_questions": s.num_questions,
-            "created_at": s.created_at,
-            "last_score": latest_attempt.score if latest_attempt else None,
-            "total_questions": latest_attempt.total_questions if latest_attempt else None,
-            "attempted_at": latest_attempt.attempted_at if latest_attempt else None
-        })
+            "attempts": s.attempts,
+            "best_score": s.best_score,
+            "average_score": float(s.average_score) if s.average_score is not None else None
+        } for s in doc_stats]
 
-    return {"status": True, "history": output}
+    return response
@@ -0,0 +1,57 @@
+"""Convert DocChunks.embedding JSON lists into binary float32 embedding_bin rows.
+
+Usage (from Backend/backend, after `alembic upgrade head` added the column):
+    python migrate_embeddings.py [--batch-size 500] [--drop-json]
+"""
+import argparse
+
+from DatabaseConnection import session
+from DatabaseModels import DocChunks
+from EmbeddingStorage import to_bytes
+
+
+def migrate(batch_size=500, drop_json=False):
+    db = session()
+    converted = 0
+    last_id = 0
+
+    try:
+        while True:
+            rows = db.query(DocChunks.id, DocChunks.embedding) \
+                     .filter(DocChunks.id > last_id,
+                             DocChunks.embedding_bin.is_(None),
+                             DocChunks.embedding.isnot(None)) \
+                     .order_by(DocChunks.id.asc()) \
+                     .limit(batch_size).all()
+
+            if not rows:
+                break
+
+            updates = []
+            for r in rows:
+                values = {"id": r.id, "embedding_bin": to_bytes(r.embedding)}
+                if drop_json:
+                    values["embedding"] = None
+                updates.append(values)
+
+            db.bulk_update_mappings(DocChunks, updates)
+            db.commit()
+
+            last_id = rows[-1].id
+            converted += len(rows)
+            print(f"converted {converted} rows (last id {last_id})")
+    finally:
+        db.close()
+
+    print(f"done: {converted} rows converted")
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-json", action="store_true",
+                        help="clear the legacy JSON column after converting")
+    args = parser.parse_args()
+
+    migrate(batch_size=args.batch_size, drop_json=args.drop_json)
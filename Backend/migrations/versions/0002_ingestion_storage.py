@@ -0,0 +1,56 @@
+"""binary embeddings, ingestion jobs, content-hash dedupe
+
+Revision ID: 0002_ingestion_storage
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_ingestion_storage"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Binary float32 embeddings (JSON column kept for unmigrated rows)
+    op.add_column("doc_chunks", sa.Column("embedding_bin", sa.LargeBinary(), nullable=True))
+    op.alter_column("doc_chunks", "embedding", existing_type=sa.JSON(), nullable=True)
+
+    # Background ingestion jobs
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("stage", sa.String(50), nullable=True),
+        sa.Column("progress", sa.Integer(), nullable=False),
+        sa.Column("chunks_created", sa.Integer(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ingestion_jobs_id", "ingestion_jobs", ["id"])
+
+    # Content-hash dedupe
+    op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+
+    op.create_table(
+        "embedding_cache",
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("model_name", sa.String(255), primary_key=True),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("embedding_cache")
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
+    op.drop_table("ingestion_jobs")
+    op.alter_column("doc_chunks", "embedding", existing_type=sa.JSON(), nullable=False)
+    op.drop_column("doc_chunks", "embedding_bin")
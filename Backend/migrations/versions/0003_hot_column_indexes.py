@@ -0,0 +1,41 @@
+"""indexes for the hot query columns
+
+Revision ID: 0003_hot_column_indexes
+Revises: 0002_ingestion_storage
+Create Date: 2026-10-18
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL so a live database keeps
+accepting writes while the indexes are created.
+"""
+from alembic import op
+
+
+revision = "0003_hot_column_indexes"
+down_revision = "0002_ingestion_storage"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_messages_chat_id_created_at", "messages", ["chat_id", "created_at"]),
+    ("ix_doc_chunks_document_id_chunk_index", "doc_chunks", ["document_id", "chunk_index"]),
+    ("ix_chats_user_id_created_at", "chats", ["user_id", "created_at"]),
+    ("ix_documents_user_id", "documents", ["user_id"]),
+    ("ix_quiz_sessions_user_id_created_at", "quiz_sessions", ["user_id", "created_at"]),
+    ("ix_quiz_attempts_user_id_quiz_id", "quiz_attempts", ["user_id", "quiz_id"]),
+    ("ix_quiz_attempts_quiz_id_attempted_at", "quiz_attempts", ["quiz_id", "attempted_at"]),
+    ("ix_ingestion_jobs_document_id", "ingestion_jobs", ["document_id"]),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
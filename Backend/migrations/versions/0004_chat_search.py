@@ -0,0 +1,69 @@
+"""full-text search columns and GIN indexes for chats and messages
+
+Revision ID: 0004_chat_search
+Revises: 0003_hot_column_indexes
+Create Date: 2026-10-18
+
+No table rewrite: the tsvector columns are added nullable (metadata-only),
+kept current by BEFORE INSERT/UPDATE triggers, backfilled in small
+autocommitted batches, and the GIN indexes are built concurrently.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_chat_search"
+down_revision = "0003_hot_column_indexes"
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH = 5000
+
+# (table, searched column)
+SEARCHED = [("messages", "content"), ("chats", "title")]
+
+
+def upgrade():
+    for table, column in SEARCHED:
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := to_tsvector('english', coalesce(NEW.{column}, ''));
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}")
+        op.execute(f"CREATE TRIGGER {table}_search_vector_trg "
+                   f"BEFORE INSERT OR UPDATE OF {column} ON {table} "
+                   f"FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()")
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+
+        # Rows written before the trigger existed, one short transaction per id range
+        for table, column in SEARCHED:
+            max_id = conn.execute(sa.text(f"SELECT coalesce(max(id), 0) FROM {table}")).scalar()
+            for start in range(0, max_id, BACKFILL_BATCH):
+                conn.execute(sa.text(
+                    f"UPDATE {table} SET search_vector = to_tsvector('english', coalesce({column}, '')) "
+                    f"WHERE id > :start AND id <= :stop AND search_vector IS NULL"
+                ), {"start": start, "stop": start + BACKFILL_BATCH})
+
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_search_vector "
+                   "ON messages USING GIN (search_vector)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chats_search_vector "
+                   "ON chats USING GIN (search_vector)")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chats_search_vector")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_search_vector")
+
+    for table, _ in reversed(SEARCHED):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
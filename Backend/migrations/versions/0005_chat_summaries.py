@@ -0,0 +1,28 @@
+"""rolling conversation summaries per chat
+
+Revision ID: 0005_chat_summaries
+Revises: 0004_chat_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_chat_summaries"
+down_revision = "0004_chat_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_summaries",
+        sa.Column("chat_id", sa.Integer(), sa.ForeignKey("chats.id"), primary_key=True),
+        sa.Column("summary", sa.String(), nullable=False),
+        sa.Column("summarized_upto_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("chat_summaries")
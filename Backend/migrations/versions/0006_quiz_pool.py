@@ -0,0 +1,39 @@
+"""pre-generated quiz question pool
+
+Revision ID: 0006_quiz_pool
+Revises: 0005_chat_summaries
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_quiz_pool"
+down_revision = "0005_chat_summaries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "quiz_pool_questions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column("question_hash", sa.String(64), nullable=False),
+        sa.Column("question_json", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("document_id", "question_hash", name="uq_quiz_pool_document_question"),
+    )
+    op.create_index("ix_quiz_pool_questions_id", "quiz_pool_questions", ["id"])
+
+    op.create_table(
+        "quiz_pool_served",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("quiz_pool_questions.id"), primary_key=True),
+        sa.Column("served_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("quiz_pool_served")
+    op.drop_table("quiz_pool_questions")
@@ -0,0 +1,65 @@
+"""unique chunk positions and one running ingestion job per document
+
+Revision ID: 0007_ingestion_job_claims
+Revises: 0006_quiz_pool
+Create Date: 2026-10-18
+
+Indexes are built CONCURRENTLY on PostgreSQL; duplicate rows left behind by
+earlier double-processed documents are removed first so the unique index
+can be created.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_ingestion_job_claims"
+down_revision = "0006_quiz_pool"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the lowest id of every (document_id, chunk_index) position
+    op.execute("""
+        DELETE FROM doc_chunks
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY document_id, chunk_index ORDER BY id
+                ) AS rn
+                FROM doc_chunks
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+
+    # Only the newest running job per document stays running
+    op.execute("""
+        UPDATE ingestion_jobs SET status = 'queued'
+        WHERE status = 'running' AND id NOT IN (
+            SELECT max(id) FROM ingestion_jobs WHERE status = 'running' GROUP BY document_id
+        )
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index("uq_doc_chunks_document_id_chunk_index", "doc_chunks",
+                        ["document_id", "chunk_index"], unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index("ix_doc_chunks_document_id_chunk_index", table_name="doc_chunks",
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index("uq_ingestion_jobs_running_document", "ingestion_jobs",
+                        ["document_id"], unique=True,
+                        postgresql_where=sa.text("status = 'running'"),
+                        sqlite_where=sa.text("status = 'running'"),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("uq_ingestion_jobs_running_document", table_name="ingestion_jobs",
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index("ix_doc_chunks_document_id_chunk_index", "doc_chunks",
+                        ["document_id", "chunk_index"],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index("uq_doc_chunks_document_id_chunk_index", table_name="doc_chunks",
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,26 @@
+"""store missing legacy chunk embeddings as SQL NULL
+
+Revision ID: 0008_embedding_sql_null
+Revises: 0007_ingestion_job_claims
+Create Date: 2026-10-18
+
+Chunks written with embedding_bin had their legacy embedding column set to
+the JSON value 'null' instead of SQL NULL, so `embedding IS NULL` missed
+them. The model now maps None to SQL NULL; existing rows are converted.
+"""
+from alembic import op
+
+
+revision = "0008_embedding_sql_null"
+down_revision = "0007_ingestion_job_claims"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE doc_chunks SET embedding = NULL WHERE embedding::text = 'null'")
+
+
+def downgrade():
+    # Nothing to undo: both SQL NULL and JSON 'null' load as None
+    pass
@@ -0,0 +1,101 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .embeddings import get_embedding_model
+
+
+# ------------------------------
+# Micro-batching query embedder
+# ------------------------------
+# Concurrent single-text encode() calls are queued and coalesced into one
+# model.encode() batch (up to EMBED_BATCH_MAX_SIZE texts, waiting at most
+# EMBED_BATCH_MAX_WAIT_MS after the first one arrives). The forward pass runs
+# on a worker thread so the event loop stays free.
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    def __init__(self, max_batch_size=EMBED_BATCH_MAX_SIZE, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS,
+                 model_getter=get_embedding_model):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.model_getter = model_getter
+
+        self._queue = None
+        self._worker = None
+        # A single thread: batches are already coalesced, parallel forward
+        # passes would only fight over the same cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-batch")
+
+        self.batches = 0
+        self.texts = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def encode(self, text):
+        """Embed one text; resolves with a float32 vector once its batch has run."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _encode_batch(self, texts):
+        # Runs in the executor: the first call may load the model (or wait on
+        # the warm-up holding the registry lock), which must not block the loop
+        return self.model_getter().encode(texts)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_batch, texts)
+                vectors = np.asarray(vectors, dtype="float32")
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():   # caller may have been cancelled
+                    future.set_result(vector)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": (self.texts / self.batches) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+query_embedder = EmbeddingBatcher()
@@ -0,0 +1,159 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+
+# ------------------------------
+# Embedding model registry
+# ------------------------------
+# One embedding model per process, shared by rag_engine and the API.
+# Loaded lazily on first use, or up front through warm_up().
+#
+# EMBEDDING_BACKEND:
+#   "torch" → sentence-transformers (PyTorch)
+#   "onnx"  → same model exported to ONNX, int8 dynamic quantization, run
+#             with ONNX Runtime on CPU
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None   # None → let the library pick
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 → library default
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "eduquest-onnx"))
+
+_models = {}
+_load_seconds = {}
+_lock = threading.Lock()
+
+
+def _hub_name(name):
+    return name if "/" in name else f"sentence-transformers/{name}"
+
+
+class OnnxEmbeddingModel:
+    """Mean-pooled, L2-normalised sentence embeddings from a quantized ONNX export.
+
+    Matches the sentence-transformers pipeline for all-MiniLM-L6-v2
+    (Transformer → mean pooling → Normalize) and exposes the same encode().
+    """
+
+    def __init__(self, model_name, cache_dir=ONNX_CACHE_DIR, threads=EMBEDDING_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = os.path.join(cache_dir, _hub_name(model_name).replace("/", "__"))
+        quantized_path = os.path.join(model_dir, "model_int8.onnx")
+
+        if not os.path.exists(quantized_path):
+            self._export(model_name, model_dir, quantized_path)
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(quantized_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    @staticmethod
+    def _export(model_name, model_dir, quantized_path):
+        # The API warm-up and every spawned ingestion worker may export at the
+        # same time: each builds in its own temp dir and the finished export is
+        # renamed into place, so model_dir is never seen half-written.
+        from optimum.exporters.onnx import main_export
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        parent = os.path.dirname(model_dir)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=parent)
+
+        try:
+            main_export(_hub_name(model_name), output=tmp_dir, task="feature-extraction")
+            quantize_dynamic(
+                os.path.join(tmp_dir, "model.onnx"),
+                os.path.join(tmp_dir, os.path.basename(quantized_path)),
+                weight_type=QuantType.QInt8,
+            )
+
+            try:
+                os.replace(tmp_dir, model_dir)
+            except OSError:
+                if os.path.exists(quantized_path):
+                    return   # another process finished first
+                # Leftover incomplete dir from an older crashed export
+                stale = f"{model_dir}.stale-{os.getpid()}"
+                os.replace(model_dir, stale)
+                shutil.rmtree(stale, ignore_errors=True)
+                os.replace(tmp_dir, model_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        outputs = []
+        for i in range(0, len(sentences), batch_size):
+            batch = sentences[i:i + batch_size]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=256, return_tensors="np")
+            feeds = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+
+        if not outputs:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(outputs)
+
+
+def _load_model(backend):
+    if backend == "onnx":
+        return OnnxEmbeddingModel(EMBEDDING_MODEL_NAME)
+
+    from sentence_transformers import SentenceTransformer
+
+    if EMBEDDING_THREADS > 0:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME, device=EMBEDDING_DEVICE)
+
+
+def get_embedding_model(backend=None):
+    backend = backend or EMBEDDING_BACKEND
+    model = _models.get(backend)
+    if model is None:
+        with _lock:
+            model = _models.get(backend)
+            if model is None:
+                start = time.perf_counter()
+                model = _load_model(backend)
+                _models[backend] = model
+                _load_seconds[backend] = time.perf_counter() - start
+                print(f"Loaded embedding model {EMBEDDING_MODEL_NAME} ({backend}) "
+                      f"in {_load_seconds[backend]:.2f}s")
+    return model
+
+
+def warm_up():
+    """Load the model and run one encode so the first real request is not slow."""
+    get_embedding_model().encode(["warm up"])
+    return _load_seconds.get(EMBEDDING_BACKEND)
+
+
+def embedding_model_info():
+    return {
+        "model": EMBEDDING_MODEL_NAME,
+        "backend": EMBEDDING_BACKEND,
+        "device": EMBEDDING_DEVICE,
+        "threads": EMBEDDING_THREADS or None,
+        "loaded": EMBEDDING_BACKEND in _models,
+        "load_seconds": _load_seconds.get(EMBEDDING_BACKEND),
+    }
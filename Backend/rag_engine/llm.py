@@ -0,0 +1,110 @@
+import os
+import json
+import asyncio
+
+import httpx
+
+
+# ------------------------------
+# Shared async LLM client (Groq, OpenAI-compatible API)
+# ------------------------------
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+
+_client = None
+_client_lock = asyncio.Lock()
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def get_client():
+    """Return the process-wide AsyncClient, creating it on first use."""
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                _client = httpx.AsyncClient(
+                    http2=_http2_available(),
+                    timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                    ),
+                    headers={
+                        "Authorization": f"Bearer {GROQ_API_KEY}",
+                        "Content-Type": "application/json",
+                    },
+                )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def chat_completion(payload, timeout=None):
+    """POST a chat completion and return the decoded JSON response."""
+    payload = {"model": LLM_MODEL, **payload}
+    client = await get_client()
+
+    kwargs = {}
+    if timeout is not None:
+        kwargs["timeout"] = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT)
+
+    response = await client.post(GROQ_API_URL, json=payload, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+async def chat_completion_text(payload, timeout=None):
+    result = await chat_completion(payload, timeout=timeout)
+    return result["choices"][0]["message"]["content"]
+
+
+async def stream_chat_completion(payload, timeout=None):
+    """Yield content deltas from a streaming chat completion as they arrive.
+
+    The upstream response is closed when the generator finishes or is closed
+    early (e.g. the downstream client disconnected).
+    """
+    payload = {"model": LLM_MODEL, **payload, "stream": True}
+    client = await get_client()
+
+    kwargs = {}
+    if timeout is not None:
+        kwargs["timeout"] = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT)
+
+    async with client.stream("POST", GROQ_API_URL, json=payload, **kwargs) as response:
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+
+# ------------------------------
+# OCR stage: content-hash cache + preprocessing + worker pool
+# ------------------------------
+# Results are cached on disk by the hash of the original image (plus the
+# preprocessing settings), so the same slide screenshot or scanned page is
+# only OCR'd once. Very large images are downsampled and binarized before
+# Tesseract sees them (smaller ones go in untouched: Tesseract thresholds
+# internally, and a global threshold can hurt photos and gradients), and
+# batches of images are spread over a process pool. Each image's OCR time is
+# logged and stored with its cache entry.
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join("uploads", "ocr_cache"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2500"))        # px, longest side
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") == "1"           # only images over OCR_MAX_SIDE
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_WINDOW = max(1, int(os.getenv("OCR_WINDOW", "8")))      # preprocessed misses held at once
+
+
+class OcrResult:
+    def __init__(self, text, key, seconds, cached):
+        self.text = text
+        self.key = key
+        self.seconds = seconds     # OCR time when the result was produced
+        self.cached = cached
+
+
+def _settings_tag():
+    return f"{OCR_MAX_SIDE}-{int(OCR_BINARIZE)}-{OCR_LANG}"
+
+
+def image_key(source):
+    """Cache key from the image content: file bytes for paths, pixels for PIL images."""
+    h = hashlib.sha256()
+    if isinstance(source, Image.Image):
+        h.update(f"{source.mode}{source.size}".encode())
+        h.update(source.tobytes())
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+    h.update(_settings_tag().encode())
+    return h.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(OCR_CACHE_DIR, key[:2], key + ".json")
+
+
+def cache_get(key):
+    try:
+        with open(_cache_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cache_put(key, text, seconds):
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"text": text, "seconds": seconds}, f)
+    os.replace(tmp, path)
+
+
+def _otsu_threshold(gray):
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    mean_bg = sum_bg / np.maximum(weight_bg, 1)
+    mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def preprocess(img):
+    """Images over OCR_MAX_SIDE: grayscale, downsample, then Otsu-binarize.
+
+    Smaller images are returned as they are.
+    """
+    if max(img.size) <= OCR_MAX_SIDE:
+        return img
+
+    img = img.convert("L")
+    img.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.LANCZOS)
+
+    if OCR_BINARIZE:
+        gray = np.asarray(img, dtype=np.uint8)
+        img = Image.fromarray(np.where(gray > _otsu_threshold(gray), 255, 0).astype(np.uint8))
+
+    return img
+
+
+def _run_tesseract(img):
+    # Runs in the caller or in a pool worker; returns (text, seconds)
+    t0 = time.perf_counter()
+    text = pytesseract.image_to_string(img, lang=OCR_LANG)
+    return text, time.perf_counter() - t0
+
+
+def _prepared(source):
+    # Preprocessed in-memory image; files are closed before returning
+    if isinstance(source, Image.Image):
+        return preprocess(source)
+    with Image.open(source) as img:
+        img.load()
+        prepared = preprocess(img)
+        return prepared.copy() if prepared is img else prepared
+
+
+def _record(result, label):
+    if not result.cached:
+        print(f"OCR {label}: {result.seconds:.2f}s, {len(result.text)} chars")
+    return result
+
+
+def _label(source):
+    return "<page image>" if isinstance(source, Image.Image) else os.path.basename(source)
+
+
+def ocr_image(source):
+    """OCR one image (path or PIL image) through the cache."""
+    key = image_key(source)
+    hit = cache_get(key)
+    if hit is not None:
+        return _record(OcrResult(hit["text"], key, hit["seconds"], True), _label(source))
+
+    text, seconds = _run_tesseract(_prepared(source))
+    cache_put(key, text, seconds)
+    return _record(OcrResult(text, key, seconds, False), _label(source))
+
+
+def ocr_images(sources, workers=None, pool=None):
+    """OCR many images; cache hits are served directly, misses go to a process pool.
+
+    `sources` may be a generator (e.g. rendered PDF pages): each image is keyed
+    and preprocessed as it arrives, and misses are OCR'd in windows of
+    OCR_WINDOW images, so memory does not grow with the number of images. An
+    existing process pool can be passed in (extract_pages shares its own);
+    otherwise one is created for the call. Returns results in input order.
+    """
+    workers = workers or OCR_WORKERS
+    results = []
+    window = []   # (index, key, label, preprocessed image)
+    own_pool = None
+
+    def finish(i, key, label, text, seconds):
+        cache_put(key, text, seconds)
+        results[i] = _record(OcrResult(text, key, seconds, False), label)
+
+    def flush():
+        nonlocal own_pool
+        active = pool
+        if active is None and workers > 1 and len(window) > 1:
+            if own_pool is None:
+                own_pool = ProcessPoolExecutor(max_workers=workers,
+                                               mp_context=multiprocessing.get_context("spawn"))
+            active = own_pool
+
+        if active is None:
+            for i, key, label, img in window:
+                finish(i, key, label, *_run_tesseract(img))
+        else:
+            futures = [(i, key, label, active.submit(_run_tesseract, img)) for i, key, label, img in window]
+            for i, key, label, future in futures:
+                finish(i, key, label, *future.result())
+        window.clear()
+
+    try:
+        for source in sources:
+            key = image_key(source)
+            hit = cache_get(key)
+            if hit is not None:
+                results.append(_record(OcrResult(hit["text"], key, hit["seconds"], True), _label(source)))
+                continue
+
+            window.append((len(results), key, _label(source), _prepared(source)))
+            results.append(None)
+            if len(window) >= OCR_WINDOW:
+                flush()
+
+        if window:
+            flush()
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+    return results
@@ -1,41 +1,96 @@
 import pdfplumber
-from PIL import Image
-import pytesseract
 import os
-import requests
-from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss
-import json
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-# ------------------------------
-# Load SentenceTransformer Model Once
-# ------------------------------
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# ------------------------------
-# Conversation Memory (temporary)
-# ------------------------------
-memory = []   # list of {"role": "user"/"assistant", "content": "text"}
+from .llm import chat_completion_text
+from .embeddings import get_embedding_model
+from .session_store import get_session_store
+from .web_fetch import fetch_url_text
+from .ocr import ocr_image, ocr_images
 
 
 # ------------------------------------------------------
 # 1. TEXT EXTRACTION (PDF / Image / Website)
 # ------------------------------------------------------
-def extract_text(source):
-    extracted_text = ""
+# extract_pages() usually runs inside an ingestion worker (INGEST_WORKERS of
+# them), so each process only gets its share of the cores for page ranges
+_INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 1) // _INGEST_WORKERS))))
+# spawn, not fork: the parent may be a pool worker with torch / threads loaded
+EXTRACT_MP_CONTEXT = os.getenv("EXTRACT_MP_CONTEXT", "spawn")
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "8"))
+PARALLEL_MIN_PAGES = int(os.getenv("PARALLEL_MIN_PAGES", "16"))
+OCR_RESOLUTION = 300
+
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    """One bounded page-extraction pool per process, reused across documents."""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context(EXTRACT_MP_CONTEXT),
+            )
+        return _extract_pool
+
+
+def _extract_pdf_pages(source, start, stop, ocr_fallback=True, ocr_pool=None):
+    # Runs inside a pool worker: each task opens the PDF itself and handles a
+    # contiguous page range, OCR-ing pages that have no text layer (cached by
+    # page-image hash, see ocr.py).
+    with pdfplumber.open(source) as pdf:
+        pages = pdf.pages[start:stop]
+        texts = [page.extract_text() or "" for page in pages]
+
+        scanned = [i for i, text in enumerate(texts) if not text.strip()]
+        if scanned and ocr_fallback:
+            try:
+                renders = (pages[i].to_image(resolution=OCR_RESOLUTION).original for i in scanned)
+                for i, result in zip(scanned, ocr_images(renders, workers=1, pool=ocr_pool)):
+                    texts[i] = result.text
+            except Exception:
+                pass
+    return texts
+
+
+def _pdf_page_count(source):
+    with pdfplumber.open(source) as pdf:
+        return len(pdf.pages)
+
+
+def count_pages(source):
+    """Number of pages extract_pages() will yield for a source (1 for images/URLs)."""
+    if not source.startswith("http") and os.path.splitext(source)[1].lower() == ".pdf":
+        try:
+            return _pdf_page_count(source)
+        except:
+            return 0
+    return 1
+
+
+def extract_pages(source, workers=None, ocr_fallback=True):
+    """Yield extracted text page by page, in order.
 
-    # Case 1: URL
+    Large PDFs are split into page ranges handled by a process pool; pages
+    without a text layer (scanned notes) fall back to OCR in the same worker.
+    """
+    # Case 1: URL (timeouts + on-disk HTTP cache, see web_fetch.py)
     if source.startswith("http"):
         try:
-            response = requests.get(source, headers={"User-Agent": "rag-bot"})
-            soup = BeautifulSoup(response.text, "html.parser")
-            for tag in soup(["script", "style", "noscript"]):
-                tag.decompose()
-            return "\n".join([p.get_text(strip=True) for p in soup.find_all("p")])
+            yield fetch_url_text(source)
         except:
-            return ""
+            yield ""
+        return
 
     # Case 2: File Extensions
     ext = os.path.splitext(source)[1].lower()
@@ -43,24 +98,58 @@ def extract_text(source):
     # PDF
     if ext == ".pdf":
         try:
-            with pdfplumber.open(source) as pdf:
-                for page in pdf.pages:
-                    extracted_text += (page.extract_text() or "") + "\n"
+            num_pages = _pdf_page_count(source)
         except:
-            pass
+            return
+
+        workers = min(workers or EXTRACT_WORKERS, EXTRACT_WORKERS)
+        step = EXTRACT_PAGES_PER_TASK
+
+        # Extraction errors propagate: a failed page range must fail the
+        # ingestion job rather than silently truncate the document
+        if workers <= 1 or num_pages < PARALLEL_MIN_PAGES:
+            # Same page ranges as the pool path, so only one range of pages
+            # (and its renders) is held at a time
+            ocr_pool = get_extract_pool() if workers > 1 else None
+            for start in range(0, num_pages, step):
+                yield from _extract_pdf_pages(source, start, start + step, ocr_fallback, ocr_pool=ocr_pool)
+            return
+
+        starts = list(range(0, num_pages, step))
+        workers = min(workers, len(starts))
+        pool = get_extract_pool()
+
+        # Only keep a small window of page ranges in flight so a slow
+        # consumer never has the whole document buffered in memory;
+        # futures are drained in submission order → pages stay ordered.
+        pending = deque()
+        try:
+            for start in starts:
+                pending.append(pool.submit(_extract_pdf_pages, source, start, start + step, ocr_fallback))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:   # consumer stopped early / a range failed
+                future.cancel()
 
     # Image
     elif ext in [".png", ".jpg", ".jpeg"]:
         try:
-            img = Image.open(source)
-            extracted_text = pytesseract.image_to_string(img)
+            yield ocr_image(source).text
         except:
             pass
 
     else:
-        return "Unsupported file format"
+        raise ValueError("Unsupported file format")
 
-    return extracted_text
+
+def extract_text(source, workers=None):
+    try:
+        return "".join(page + "\n" for page in extract_pages(source, workers=workers))
+    except ValueError:
+        return "Unsupported file format"
 
 
 # ------------------------------------------------------
@@ -71,11 +160,35 @@ def chunk_text(text, chunk_size=200):
     return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
 
 
+def iter_chunks(pages, chunk_size=200):
+    """Streaming chunk_text(): same chunks, but words are carried across pages
+    so only one chunk's worth of text is buffered at a time."""
+    buffer = []
+    for page in pages:
+        buffer.extend(page.split())
+        while len(buffer) >= chunk_size:
+            yield " ".join(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield " ".join(buffer)
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 # ------------------------------------------------------
 # 3. BUILD FAISS INDEX (for retrieval)
 # ------------------------------------------------------
 def build_faiss_index(chunks):
-    embeddings = model.encode(chunks)
+    embeddings = get_embedding_model().encode(chunks)
     dim = len(embeddings[0])
 
     index = faiss.IndexFlatL2(dim)
@@ -89,26 +202,23 @@ def build_faiss_index(chunks):
 # ------------------------------------------------------
 # 4. ASK QUESTION (RAG + Memory + Groq LLM)
 # ------------------------------------------------------
-def ask_question(user_question, index, mapping, top_k=3):
+async def ask_question(user_question, index, mapping, top_k=3, *, session_id):
     # 1. Embed the question
-    q_emb = model.encode([user_question])
+    q_emb = get_embedding_model().encode([user_question])
     q_emb = np.array(q_emb, dtype="float32")
 
     # 2. Retrieve top chunks
     distances, idxs = index.search(q_emb, top_k)
     relevant_text = "\n".join(mapping[i] for i in idxs[0])
 
-    # 3. Build conversation memory (last 3 messages)
+    # 3. Build conversation memory (last 3 exchanges of this session only)
+    store = get_session_store()
     history = ""
-    for msg in memory[-6:]:
+    for msg in store.history(session_id, limit=6):
         history += f"{msg['role']}: {msg['content']}\n"
 
-    # 4. Send to Groq API
-    api_url = "https://api.groq.com/openai/v1/chat/completions"
-    api_key = ""
-
+    # 4. Send to Groq API (shared async client)
     payload = {
-        "model": "llama-3.3-70b-versatile",
         "messages": [
             {"role": "system", "content": "You are a helpful RAG assistant."},
             {
@@ -122,16 +232,10 @@ def ask_question(user_question, index, mapping, top_k=3):
         "temperature": 0.7,
     }
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    response = requests.post(api_url, json=payload, headers=headers).json()
-    answer = response["choices"][0]["message"]["content"]
+    answer = await chat_completion_text(payload)
 
     # 5. Update memory
-    memory.append({"role": "user", "content": user_question})
-    memory.append({"role": "assistant", "content": answer})
+    store.append(session_id, "user", user_question)
+    store.append(session_id, "assistant", answer)
 
     return answer
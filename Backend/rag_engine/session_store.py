@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+
+
+# ------------------------------
+# Per-session conversation store for ask_question()
+# ------------------------------
+# Replaces the old process-global `memory` list, which grew forever and
+# mixed every user's history into every prompt.
+#
+# SESSION_STORE_BACKEND:
+#   "memory" → in-process, per-session length cap, idle TTL and an overall
+#              byte budget (least recently used sessions evicted first)
+#   "redis"  → any Redis-compatible server at SESSION_STORE_URL, so several
+#              workers share sessions; caps via LTRIM, idle TTL via EXPIRE,
+#              overall budget via the server's maxmemory policy
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0")
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_TOTAL_BYTES = int(os.getenv("SESSION_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+
+def _message_size(message):
+    return len(message["role"]) + len(message["content"])
+
+
+class _Session:
+    def __init__(self, max_messages):
+        self.messages = deque(maxlen=max_messages)
+        self.nbytes = 0
+        self.last_access = time.monotonic()
+
+
+class InMemorySessionStore:
+    def __init__(self, max_messages=SESSION_MAX_MESSAGES, idle_ttl=SESSION_IDLE_TTL,
+                 max_total_bytes=SESSION_MAX_TOTAL_BYTES):
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_total_bytes = max_total_bytes
+
+        self._sessions = OrderedDict()   # session_id → _Session, LRU order
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _drop(self, session_id):
+        sess = self._sessions.pop(session_id)
+        self._total_bytes -= sess.nbytes
+        self.evictions += 1
+
+    def _expire_idle(self, now):
+        # Oldest-accessed sessions are at the front of the OrderedDict
+        while self._sessions:
+            session_id, sess = next(iter(self._sessions.items()))
+            if now - sess.last_access < self.idle_ttl:
+                break
+            self._drop(session_id)
+
+    def append(self, session_id, role, content):
+        message = {"role": role, "content": content}
+        size = _message_size(message)
+
+        with self._lock:
+            now = time.monotonic()
+            self._expire_idle(now)
+
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                sess = self._sessions[session_id] = _Session(self.max_messages)
+
+            if len(sess.messages) == sess.messages.maxlen:
+                dropped = sess.messages[0]   # deque drops it on append
+                sess.nbytes -= _message_size(dropped)
+                self._total_bytes -= _message_size(dropped)
+
+            sess.messages.append(message)
+            sess.nbytes += size
+            self._total_bytes += size
+            sess.last_access = now
+            self._sessions.move_to_end(session_id)
+
+            while self._total_bytes > self.max_total_bytes and len(self._sessions) > 1:
+                self._drop(next(iter(self._sessions)))
+
+    def history(self, session_id, limit=None):
+        with self._lock:
+            now = time.monotonic()
+            self._expire_idle(now)
+
+            sess = self._sessions.get(session_id)
+            if sess is None:
+                return []
+
+            sess.last_access = now
+            self._sessions.move_to_end(session_id)
+            messages = list(sess.messages)
+
+        return messages[-limit:] if limit else messages
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                sess = self._sessions.pop(session_id)
+                self._total_bytes -= sess.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class RedisSessionStore:
+    def __init__(self, url=SESSION_STORE_URL, max_messages=SESSION_MAX_MESSAGES,
+                 idle_ttl=SESSION_IDLE_TTL, prefix="eduquest:session:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_messages = max_messages
+        self.idle_ttl = int(idle_ttl)
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f"{self.prefix}{session_id}"
+
+    def append(self, session_id, role, content):
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, json.dumps({"role": role, "content": content}))
+        pipe.ltrim(key, -self.max_messages, -1)
+        pipe.expire(key, self.idle_ttl)
+        pipe.execute()
+
+    def history(self, session_id, limit=None):
+        key = self._key(session_id)
+        start = -limit if limit else 0
+        pipe = self.client.pipeline()
+        pipe.lrange(key, start, -1)
+        pipe.expire(key, self.idle_ttl)   # reading counts as activity
+        raw, _ = pipe.execute()
+        return [json.loads(item) for item in raw]
+
+    def clear(self, session_id):
+        self.client.delete(self._key(session_id))
+
+    def stats(self):
+        info = self.client.info("memory")
+        return {
+            "backend": "redis",
+            "used_memory": info.get("used_memory"),
+            "maxmemory": info.get("maxmemory"),
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE_BACKEND == "redis":
+                    _store = RedisSessionStore()
+                else:
+                    _store = InMemorySessionStore()
+    return _store
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import hashlib
+import ipaddress
+from urllib.parse import urlsplit, urljoin
+
+import httpx
+import httpcore
+from bs4 import BeautifulSoup
+
+
+# ------------------------------
+# Concurrent URL fetching with an on-disk HTTP cache
+# ------------------------------
+# A batch of URLs is fetched concurrently (WEB_MAX_CONCURRENCY overall,
+# WEB_PER_HOST_LIMIT per host) with timeouts. Responses are cached on disk
+# with their ETag / Last-Modified validators, so re-ingesting an unchanged
+# page costs one conditional request answered with 304. Entries younger than
+# max_age are served without touching the network at all.
+#
+# Fetched text ends up readable through /ask, so only public addresses are
+# fetched: every connection (including each redirect hop) resolves the host,
+# refuses private, loopback, link-local (cloud metadata) and reserved
+# addresses, and then connects to exactly the address it checked.
+
+WEB_CACHE_DIR = os.getenv("WEB_CACHE_DIR", os.path.join("uploads", "web_cache"))
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "15"))
+WEB_MAX_CONCURRENCY = int(os.getenv("WEB_MAX_CONCURRENCY", "16"))
+WEB_PER_HOST_LIMIT = int(os.getenv("WEB_PER_HOST_LIMIT", "4"))
+WEB_CACHE_FRESH_SECONDS = float(os.getenv("WEB_CACHE_FRESH_SECONDS", "300"))
+WEB_MAX_REDIRECTS = int(os.getenv("WEB_MAX_REDIRECTS", "5"))
+WEB_ALLOW_PRIVATE = os.getenv("WEB_ALLOW_PRIVATE", "0") == "1"   # local development only
+USER_AGENT = "rag-bot"
+
+
+class FetchResult:
+    def __init__(self, url, html="", status=None, from_cache=False, error=None):
+        self.url = url
+        self.html = html
+        self.status = status
+        self.from_cache = from_cache
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class DiskHttpCache:
+    def __init__(self, root=WEB_CACHE_DIR):
+        self.root = root
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "r", encoding="utf-8") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _write(self, path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def store(self, url, response, body):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        meta = {
+            "url": url,
+            "status": response.status_code,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+        # Body first: a meta file always points at a complete body
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta))
+
+    def touch(self, url, meta):
+        meta_path, _ = self._paths(url)
+        meta = dict(meta, fetched_at=time.time())
+        self._write(meta_path, json.dumps(meta))
+
+
+def html_to_text(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "footer"]):
+        tag.decompose()
+    blocks = soup.find_all(["h1", "h2", "h3", "h4", "p", "li"])
+    return "\n".join(text for text in (b.get_text(" ", strip=True) for b in blocks) if text)
+
+
+class BlockedAddress(Exception):
+    pass
+
+
+def check_public_url(url):
+    """Raise BlockedAddress unless `url` is an http(s) URL with a host."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise BlockedAddress(f"Unsupported URL: {url}")
+
+
+async def _resolve(host, port):
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise BlockedAddress(f"Cannot resolve {host}: {e}")
+    return [info[4][0] for info in infos]
+
+
+async def resolve_public(host, port, allow_private=WEB_ALLOW_PRIVATE):
+    """Resolve `host` once; raise BlockedAddress if any address is not public."""
+    addresses = await _resolve(host, port)
+    if not allow_private:
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split("%")[0])
+            if not ip.is_global:
+                raise BlockedAddress(f"Refusing non-public address {ip} for {host}")
+    return addresses
+
+
+class PublicOnlyBackend(httpcore.AsyncNetworkBackend):
+    """Connect only to addresses resolve_public() has just validated.
+
+    Checking a hostname and then letting the HTTP client resolve it again
+    leaves a DNS-rebinding window; resolving and connecting in one place
+    closes it. TLS still verifies the certificate against the hostname.
+    """
+
+    def __init__(self, allow_private=WEB_ALLOW_PRIVATE):
+        self.allow_private = allow_private
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await resolve_public(host, port, self.allow_private)
+        error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise BlockedAddress("Unix sockets are not fetched")
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+def public_only_transport(allow_private=WEB_ALLOW_PRIVATE, **kwargs):
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    # httpx does not take a network backend; its connection pool does
+    transport._pool._network_backend = PublicOnlyBackend(allow_private)
+    return transport
+
+
+async def _get(client, url, headers):
+    # Redirects are followed by hand so every hop is checked again
+    for _ in range(WEB_MAX_REDIRECTS + 1):
+        check_public_url(url)
+        response = await client.get(url, headers=headers)
+        if response.status_code not in (301, 302, 303, 307, 308) or "location" not in response.headers:
+            return response
+        url = urljoin(url, response.headers["location"])
+    raise httpx.TooManyRedirects(f"More than {WEB_MAX_REDIRECTS} redirects", request=response.request)
+
+
+async def _fetch_one(client, cache, url, host_limits, global_limit, max_age):
+    meta, body = cache.load(url)
+
+    if meta and max_age and time.time() - meta.get("fetched_at", 0) < max_age:
+        return FetchResult(url, body, meta.get("status"), from_cache=True)
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    # Per-host slot first: a request queued behind a busy host must not sit on
+    # one of the global slots other hosts could use
+    host = urlsplit(url).netloc
+    async with host_limits.setdefault(host, asyncio.Semaphore(WEB_PER_HOST_LIMIT)), global_limit:
+        try:
+            response = await _get(client, url, headers)
+        except BlockedAddress as e:
+            return FetchResult(url, error=str(e))
+        except httpx.HTTPError as e:
+            if meta:   # network trouble → fall back to the stale copy
+                return FetchResult(url, body, meta.get("status"), from_cache=True)
+            return FetchResult(url, error=str(e))
+
+    if response.status_code == 304 and meta:
+        cache.touch(url, meta)
+        return FetchResult(url, body, 304, from_cache=True)
+
+    if response.status_code >= 400:
+        return FetchResult(url, status=response.status_code, error=f"HTTP {response.status_code}")
+
+    cache.store(url, response, response.text)
+    return FetchResult(url, response.text, response.status_code)
+
+
+async def fetch_urls(urls, max_age=0, cache=None, allow_private=WEB_ALLOW_PRIVATE):
+    """Fetch many URLs concurrently; returns {url: FetchResult} in input order."""
+    cache = cache or DiskHttpCache()
+    host_limits = {}
+    global_limit = asyncio.Semaphore(WEB_MAX_CONCURRENCY)
+
+    async with httpx.AsyncClient(
+        timeout=WEB_FETCH_TIMEOUT,
+        follow_redirects=False,
+        trust_env=False,   # a proxy would resolve hosts itself, past the address check
+        headers={"User-Agent": USER_AGENT},
+        transport=public_only_transport(allow_private,
+                                        limits=httpx.Limits(max_connections=WEB_MAX_CONCURRENCY)),
+    ) as client:
+        results = await asyncio.gather(*(
+            _fetch_one(client, cache, url, host_limits, global_limit, max_age)
+            for url in urls
+        ))
+
+    return dict(zip(urls, results))
+
+
+def fetch_url_text(url, max_age=WEB_CACHE_FRESH_SECONDS):
+    """Synchronous single-URL fetch for extract_pages() (runs outside the event loop)."""
+    result = asyncio.run(fetch_urls([url], max_age=max_age))[url]
+    return html_to_text(result.html) if result.ok else ""
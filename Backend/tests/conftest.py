@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests run from Backend/: make `rag_engine` and the flat backend modules importable
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+sys.path.insert(0, os.path.join(BACKEND_ROOT, "backend"))
+
+# Modules that import DatabaseConnection must never open the application database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
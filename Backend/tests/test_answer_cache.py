@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from AnswerCache import AnswerCache
+from DatabaseModels import Base, Users, Documents, IngestionJobs
+from IndexCache import document_version
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Users(id=1, email="a@x", password_hash="x"))
+    db.add(Documents(id=1, user_id=1, filename="notes.pdf", storage_path="notes.pdf"))
+    db.commit()
+    yield db
+    db.close()
+
+
+def finish_job(db, document_id):
+    db.add(IngestionJobs(document_id=document_id, status="done", progress=100))
+    db.commit()
+
+
+def test_similar_question_hits_under_the_same_version(db):
+    cache = AnswerCache(threshold=0.95)
+    finish_job(db, 1)
+    version = document_version(db, 1)
+
+    cache.store(1, version, np.array([1.0, 0.0]), "answer")
+
+    assert cache.lookup(1, version, np.array([0.99, 0.01])) == "answer"
+    assert cache.lookup(1, version, np.array([0.0, 1.0])) is None
+
+
+def test_reprocessed_document_misses(db):
+    cache = AnswerCache(threshold=0.95)
+    finish_job(db, 1)
+    cache.store(1, document_version(db, 1), np.array([1.0, 0.0]), "old answer")
+
+    # Another process reprocessed the document: no invalidate() ran here
+    finish_job(db, 1)
+
+    assert cache.lookup(1, document_version(db, 1), np.array([1.0, 0.0])) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_never_processed_as_job_uses_none_version(db):
+    cache = AnswerCache(threshold=0.95)
+    cache.store(1, document_version(db, 1), np.array([1.0, 0.0]), "answer")
+
+    assert cache.lookup(1, None, np.array([1.0, 0.0])) == "answer"
@@ -0,0 +1,72 @@
+import os
+import asyncio
+
+import httpx
+import pytest
+
+pytest.importorskip("multipart")
+from fastapi import FastAPI, File, UploadFile
+
+from BlobStorage import UploadSizeLimit, store_upload
+
+
+def make_app(root, max_bytes):
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimit, paths=["/upload"], max_bytes=max_bytes)
+    app.state.handled = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.handled += 1
+        path, digest, size, reused = await store_upload(file, root)
+        return {"path": path, "size": size, "reused": reused}
+
+    return app
+
+
+def post(app, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/upload", **kwargs)
+    return asyncio.run(run())
+
+
+def test_small_upload_is_stored_once_by_content(tmp_path):
+    app = make_app(str(tmp_path), max_bytes=10_000)
+
+    first = post(app, files={"file": ("a.pdf", b"x" * 1000)})
+    second = post(app, files={"file": ("b.pdf", b"x" * 1000)})
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["path"] == second.json()["path"]
+    assert second.json()["reused"] and os.path.exists(first.json()["path"])
+
+
+def test_oversized_content_length_is_refused_before_the_endpoint(tmp_path):
+    app = make_app(str(tmp_path), max_bytes=10_000)
+
+    response = post(app, files={"file": ("big.pdf", b"x" * 50_000)})
+
+    assert response.status_code == 413
+    assert app.state.handled == 0
+
+
+def test_streamed_body_is_cut_off_at_the_limit(tmp_path):
+    app = make_app(str(tmp_path), max_bytes=10_000)
+    boundary = "b0undary"
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + b"x" * 50_000 + f"\r\n--{boundary}--\r\n".encode()
+    sent = []
+
+    async def chunks():   # no Content-Length: only the running count can stop it
+        for i in range(0, len(body), 4096):
+            sent.append(i)
+            yield body[i:i + 4096]
+
+    response = post(app, content=chunks(),
+                    headers={"content-type": f"multipart/form-data; boundary={boundary}"})
+
+    assert response.status_code == 413
+    assert app.state.handled == 0
+    assert len(sent) * 4096 < len(body)
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from DatabaseModels import Base, Users, Chats, Messages
+from ChatSearch import setup_search, search_chats
+
+
+@pytest.fixture
+def db():
+    # SQLite FTS5 stand-in for the PostgreSQL tsvector search
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    setup_search(engine)
+
+    db = sessionmaker(bind=engine)()
+    db.add_all([Users(id=1, email="a@x", password_hash="x"),
+                Users(id=2, email="b@x", password_hash="x")])
+    db.commit()
+    yield db
+    db.close()
+
+
+def add_chat(db, user_id, title, *messages):
+    chat = Chats(user_id=user_id, title=title)
+    db.add(chat)
+    db.flush()
+    db.add_all([Messages(chat_id=chat.id, role="user", content=m) for m in messages])
+    db.commit()
+    return chat.id
+
+
+def test_title_match_outranks_message_match(db):
+    in_message = add_chat(db, 1, "Chemistry", "what is photosynthesis in plants")
+    in_title = add_chat(db, 1, "Photosynthesis notes", "light and dark reactions")
+
+    results, total = search_chats(db, 1, "photosynthesis")
+
+    assert total == 2
+    assert [r["chat_id"] for r in results] == [in_title, in_message]
+    assert "<b>photosynthesis</b>" in results[1]["snippet"]
+
+
+def test_one_result_per_chat_and_prefix_on_last_term(db):
+    chat = add_chat(db, 1, "Biology", "mitochondria produce energy", "mitochondria again")
+
+    results, total = search_chats(db, 1, "mitochond")
+
+    assert total == 1
+    assert results[0]["chat_id"] == chat
+
+
+def test_only_the_users_own_chats(db):
+    add_chat(db, 2, "Someone else", "thermodynamics")
+
+    assert search_chats(db, 1, "thermodynamics") == ([], 0)
+
+
+def test_pagination_keeps_total_and_order(db):
+    ids = [add_chat(db, 1, f"Chat {i}", "entropy " * (i + 1)) for i in range(5)]
+
+    first, total = search_chats(db, 1, "entropy", limit=2, offset=0)
+    second, _ = search_chats(db, 1, "entropy", limit=2, offset=2)
+    last, _ = search_chats(db, 1, "entropy", limit=2, offset=4)
+
+    assert total == 5
+    pages = [r["chat_id"] for r in first + second + last]
+    assert sorted(pages) == sorted(ids)
+    assert len(set(pages)) == 5
+    ranks = [r["rank"] for r in first + second + last]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+def test_empty_query(db):
+    assert search_chats(db, 1, "  !! ") == ([], 0)
@@ -0,0 +1,48 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("pdfplumber")
+faiss = pytest.importorskip("faiss")
+
+from rag_engine.rag import extract_text, chunk_text
+from rag_engine.embeddings import get_embedding_model
+
+
+# Retrieval top-k agreement between the torch model and its int8 ONNX export:
+# the opening words of sampled chunks are used as queries against both indexes.
+PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MMA.pdf")
+K = 3
+QUERIES = 50
+MIN_TOPK_AGREEMENT = 0.9
+
+
+def top_k(backend, chunks, queries):
+    model = get_embedding_model(backend)
+    vectors = np.asarray(model.encode(chunks), dtype="float32")
+    query_vectors = np.asarray(model.encode(queries), dtype="float32")
+
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index.search(query_vectors, K)[1]
+
+
+def test_onnx_retrieval_matches_torch():
+    chunks = chunk_text(extract_text(PDF), chunk_size=200)
+    assert len(chunks) > K
+
+    rng = random.Random(0)
+    sampled = rng.sample(chunks, min(QUERIES, len(chunks)))
+    queries = [" ".join(c.split()[:12]) for c in sampled]
+
+    torch_ids = top_k("torch", chunks, queries)
+    onnx_ids = top_k("onnx", chunks, queries)
+
+    agreement = np.mean([len(set(a) & set(b)) / K for a, b in zip(torch_ids, onnx_ids)])
+    assert agreement >= MIN_TOPK_AGREEMENT
+    assert np.mean(torch_ids[:, 0] == onnx_ids[:, 0]) >= MIN_TOPK_AGREEMENT
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("pytesseract")
+from PIL import Image
+
+from rag_engine import ocr
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ocr, "OCR_WINDOW", 3)
+    calls = []
+    monkeypatch.setattr(ocr, "_run_tesseract", lambda img: (calls.append(img.size) or f"text {img.size[0]}", 0.01))
+    return calls
+
+
+def pages(n, consumed):
+    for i in range(n):
+        consumed.append(i)
+        yield Image.new("L", (100 + i, 50), 255)
+
+
+def test_misses_are_ocrd_in_bounded_windows(fake_tesseract):
+    consumed = []
+    seen_when_ocrd = []
+    original = ocr._run_tesseract
+    ocr._run_tesseract = lambda img: (seen_when_ocrd.append(len(consumed)), original(img))[1]
+
+    results = ocr.ocr_images(pages(7, consumed), workers=1)
+
+    assert [r.text for r in results] == [f"text {100 + i}" for i in range(7)]
+    # never more than one window of pages pulled ahead of the OCR
+    assert max(seen - done for done, seen in enumerate(seen_when_ocrd)) <= 3
+
+
+def test_repeated_images_come_from_the_cache(fake_tesseract):
+    first = ocr.ocr_images(pages(4, []), workers=1)
+    second = ocr.ocr_images(pages(4, []), workers=1)
+
+    assert len(fake_tesseract) == 4
+    assert all(r.cached for r in second)
+    assert [r.text for r in first] == [r.text for r in second]
+
+
+def test_small_images_are_not_binarized():
+    img = Image.new("RGB", (800, 600), (120, 130, 140))
+    assert ocr.preprocess(img) is img
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from PasswordHasher import PasswordHasher, HasherBusy
+
+
+def test_cancelled_queued_call_frees_its_slot():
+    hasher = PasswordHasher(rounds=4, workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        # Occupy the only thread so the next call has to wait in the queue
+        blocker = asyncio.ensure_future(hasher._submit(release.wait))
+        while hasher.stats()["running"] == 0:
+            await asyncio.sleep(0.01)
+
+        queued = asyncio.ensure_future(hasher.hash("secret"))
+        await asyncio.sleep(0.01)
+        assert hasher.stats()["queue_depth"] == 1
+        with pytest.raises(HasherBusy):
+            await hasher.verify("secret", "x")
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert hasher.stats()["queue_depth"] == 0
+
+        release.set()
+        await blocker
+        hashed = await hasher.hash("secret")
+        assert await hasher.verify("secret", hashed)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        hasher.shutdown()
+
+    assert hasher.stats()["queue_depth"] == 0
+    assert hasher.stats()["rejected"] == 1
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import QuizPool
+from DatabaseModels import Base, Users, Documents
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Users(id=1, email="a@x", password_hash="x"))
+    db.add(Documents(id=1, user_id=1, filename="notes.pdf", storage_path="notes.pdf"))
+    db.commit()
+    yield db
+    db.close()
+
+
+def questions(start, count):
+    return [{"question": f"Question {i}?", "options": ["a", "b"], "answer": "A"}
+            for i in range(start, start + count)]
+
+
+def test_add_questions_skips_invalid_and_duplicates(db):
+    added = QuizPool.add_questions(db, 1, questions(0, 3) + questions(0, 1) + [{"question": ""}])
+
+    assert len(added) == 3
+    assert QuizPool.pool_size(db, 1) == 3
+
+
+def test_add_questions_stops_at_the_pool_cap(db, monkeypatch):
+    monkeypatch.setattr(QuizPool, "QUIZ_POOL_MAX", 5)
+
+    assert len(QuizPool.add_questions(db, 1, questions(0, 3))) == 3
+    assert len(QuizPool.add_questions(db, 1, questions(3, 10))) == 2
+    assert QuizPool.add_questions(db, 1, questions(13, 10)) == []
+    assert QuizPool.pool_size(db, 1) == 5
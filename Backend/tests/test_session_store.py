@@ -0,0 +1,63 @@
+import pytest
+
+from rag_engine import session_store
+from rag_engine.session_store import InMemorySessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_history_is_capped_per_session():
+    store = InMemorySessionStore(max_messages=3)
+
+    for i in range(5):
+        store.append("s", "user", f"m{i}")
+
+    assert [m["content"] for m in store.history("s")] == ["m2", "m3", "m4"]
+    assert [m["content"] for m in store.history("s", limit=2)] == ["m3", "m4"]
+    # Trimmed messages no longer count towards the byte total
+    assert store.stats()["bytes"] == 3 * len("userm0")
+
+
+def test_idle_sessions_expire(clock):
+    store = InMemorySessionStore(idle_ttl=60)
+    store.append("old", "user", "hello")
+    clock[0] += 30
+    store.append("active", "user", "hello")
+
+    clock[0] += 40   # "old" idle for 70s, "active" for 40s
+
+    assert store.history("old") == []
+    assert store.history("active") == [{"role": "user", "content": "hello"}]
+    assert store.stats()["sessions"] == 1
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used(clock):
+    message = "x" * 96
+    size = len("user") + len(message)
+    store = InMemorySessionStore(max_total_bytes=2 * size)
+
+    store.append("a", "user", message)
+    store.append("b", "user", message)
+    store.history("a")                      # "b" is now least recently used
+    store.append("c", "user", message)
+
+    assert store.history("b") == []
+    assert store.history("a") and store.history("c")
+    assert store.stats()["bytes"] == 2 * size
+    assert store.stats()["evictions"] == 1
+
+
+def test_clear_is_not_an_eviction():
+    store = InMemorySessionStore()
+    store.append("s", "user", "hello")
+
+    store.clear("s")
+
+    assert store.history("s") == []
+    assert store.stats() == dict(store.stats(), sessions=0, bytes=0, evictions=0)
@@ -0,0 +1,172 @@
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rag_engine import web_fetch
+from rag_engine.web_fetch import DiskHttpCache, fetch_urls, html_to_text
+
+
+PAGE = b"<html><h1>Title</h1><p>Hello world</p><script>ignored()</script></html>"
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path.startswith("/slow"):
+            time.sleep(0.5)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/page")
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.paths = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def fetch(urls, cache, **kwargs):
+    kwargs.setdefault("allow_private", True)
+    return asyncio.run(fetch_urls(urls, cache=cache, **kwargs))
+
+
+def test_first_fetch_is_200_then_revalidated_with_304(server, tmp_path):
+    cache = DiskHttpCache(str(tmp_path))
+    page = url(server, "/page")
+
+    first = fetch([page], cache)[page]
+    assert first.ok and first.status == 200 and not first.from_cache
+    assert html_to_text(first.html) == "Title\nHello world"
+
+    second = fetch([page], cache)[page]
+    assert second.ok and second.status == 304 and second.from_cache
+    assert second.html == first.html
+    assert server.paths == ["/page", "/page"]
+
+
+def test_fresh_cache_entry_skips_the_network(server, tmp_path):
+    cache = DiskHttpCache(str(tmp_path))
+    page = url(server, "/page")
+
+    fetch([page], cache)
+    result = fetch([page], cache, max_age=60)[page]
+
+    assert result.from_cache
+    assert server.paths == ["/page"]
+
+
+def test_errors_are_reported_per_url(server, tmp_path):
+    cache = DiskHttpCache(str(tmp_path))
+    page, missing = url(server, "/page"), url(server, "/missing")
+
+    results = fetch([page, missing], cache)
+
+    assert results[page].ok
+    assert not results[missing].ok
+    assert results[missing].status == 404
+
+
+def test_connection_error_without_cache(tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    closed = f"http://127.0.0.1:{httpd.server_address[1]}/page"
+    httpd.server_close()
+
+    result = fetch([closed], DiskHttpCache(str(tmp_path)))[closed]
+
+    assert not result.ok and result.error
+
+
+def test_redirects_are_followed(server, tmp_path):
+    moved = url(server, "/moved")
+
+    result = fetch([moved], DiskHttpCache(str(tmp_path)))[moved]
+
+    assert result.ok and result.status == 200
+    assert server.paths == ["/moved", "/page"]
+
+
+def test_private_addresses_are_refused_by_default(server, tmp_path):
+    page = url(server, "/page")
+
+    result = fetch([page], DiskHttpCache(str(tmp_path)), allow_private=False)[page]
+
+    assert not result.ok and "non-public" in result.error
+    assert server.paths == []
+
+
+def test_busy_host_does_not_hold_global_slots(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(web_fetch, "WEB_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(web_fetch, "WEB_PER_HOST_LIMIT", 1)
+    port = server.server_address[1]
+    slow_1 = f"http://127.0.0.1:{port}/slow1"
+    slow_2 = f"http://127.0.0.1:{port}/slow2"
+    other_host = f"http://localhost:{port}/page"
+
+    fetch([slow_1, slow_2, other_host], DiskHttpCache(str(tmp_path)))
+
+    # The second slow request waits for its host; the other host goes first
+    assert server.paths.index("/page") < server.paths.index("/slow2")
+
+
+def test_connection_goes_to_the_address_that_was_checked(server, tmp_path, monkeypatch):
+    lookups = []
+
+    async def resolve(host, port):
+        lookups.append(host)
+        return ["127.0.0.1"]
+
+    monkeypatch.setattr(web_fetch, "_resolve", resolve)
+    page = f"http://rebind.test:{server.server_address[1]}/page"
+
+    result = fetch([page], DiskHttpCache(str(tmp_path)))[page]
+
+    # One lookup, and the client never asked the system resolver about rebind.test
+    assert result.ok and result.status == 200
+    assert lookups == ["rebind.test"]
+
+
+def test_any_private_address_in_the_answer_is_refused(server, tmp_path, monkeypatch):
+    async def resolve(host, port):
+        return ["93.184.216.34", "127.0.0.1"]
+
+    monkeypatch.setattr(web_fetch, "_resolve", resolve)
+    page = f"http://rebind.test:{server.server_address[1]}/page"
+
+    result = fetch([page], DiskHttpCache(str(tmp_path)), allow_private=False)[page]
+
+    assert not result.ok and "non-public" in result.error
+    assert server.paths == []
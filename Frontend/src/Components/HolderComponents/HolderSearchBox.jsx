@@ -152,10 +152,22 @@ const startVoiceRecognition = () => {
 
       const documentId = uploadData.document_id;
 
-      // process
-      await fetch(API_ENDPOINTS.PROCESS_DOCUMENT(documentId), {
+      // process (queued as a background ingestion job)
+      const processRes = await fetch(API_ENDPOINTS.PROCESS_DOCUMENT(documentId), {
         method: "POST",
       });
+      const processData = await processRes.json();
+      if (!processData.status) throw new Error(processData.message || "Processing failed");
+
+      // poll job status until the document is ready
+      while (true) {
+        const jobRes = await fetch(API_ENDPOINTS.JOB_STATUS(processData.job_id));
+        const jobData = await jobRes.json();
+        if (!jobData.status) throw new Error("Processing failed");
+        if (jobData.job.status === "done") break;
+        if (jobData.job.status === "failed") throw new Error(jobData.job.error || "Processing failed");
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+      }
 
       // create chat
       const createRes = await fetch(API_ENDPOINTS.CREATE_CHAT, {
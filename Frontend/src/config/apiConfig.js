@@ -18,6 +18,7 @@ export const API_ENDPOINTS = {
   // doucment
   UPLOAD_DOCUMENT: (userId) => `${API_BASE_URL}/upload_document?user_id=${userId}`,
   PROCESS_DOCUMENT: (documentId) => `${API_BASE_URL}/process_document/${documentId}`,
+  JOB_STATUS: (jobId) => `${API_BASE_URL}/job_status/${jobId}`,
 
   // quiz
   GENERATE_QUIZ: `${API_BASE_URL}/generate_quiz`,